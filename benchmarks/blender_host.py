@@ -0,0 +1,69 @@
+import importlib
+import sys
+import threading
+import time
+import types
+
+# A minimal stand in for blender used by reload_benchmark.py: provides the parts of bpy used by the reload agent of
+# the test session, runs the startup script of the test and calls the registered timers until stdin is closed.
+# Usage: python blender_host.py <blender addon folder> <startup script file>
+# 代替Blender运行测试启动脚本，用于测量插件热重载的延迟
+
+
+class _Preferences:
+    @staticmethod
+    def addon_enable(module):
+        importlib.import_module(module).register()
+
+    @staticmethod
+    def addon_disable(module):
+        sys.modules[module].unregister()
+
+
+class _Timers:
+    def __init__(self):
+        self.functions = {}
+
+    def register(self, function, first_interval=0, persistent=False):
+        self.functions[function] = time.monotonic() + first_interval
+
+    def is_registered(self, function):
+        return function in self.functions
+
+    def run(self):
+        now = time.monotonic()
+        for function, due_time in list(self.functions.items()):
+            if due_time <= now:
+                interval = function()
+                if interval is None:
+                    del self.functions[function]
+                else:
+                    self.functions[function] = now + interval
+
+
+def create_bpy() -> types.ModuleType:
+    bpy = types.ModuleType("bpy")
+    bpy.ops = types.SimpleNamespace(preferences=_Preferences())
+    bpy.app = types.SimpleNamespace(driver_namespace={}, timers=_Timers())
+    bpy.types = types.SimpleNamespace(PropertyGroup=type("PropertyGroup", (), {}))
+    bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+    return bpy
+
+
+def main(addon_folder: str, script_file: str):
+    sys.path.insert(0, addon_folder)
+    bpy = create_bpy()
+    sys.modules["bpy"] = bpy
+    with open(script_file, "r", encoding="utf-8") as f:
+        exec(compile(f.read(), script_file, "exec"), {"__name__": "__main__"})
+    print("ready", flush=True)
+    # the benchmark closes stdin to stop the host
+    stdin_closed = threading.Event()
+    threading.Thread(target=lambda: (sys.stdin.read(), stdin_closed.set()), daemon=True).start()
+    while not stdin_closed.is_set():
+        bpy.app.timers.run()
+        time.sleep(0.005)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], sys.argv[2])
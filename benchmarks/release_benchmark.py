@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Benchmark of the release pipeline on a synthetic workspace. Runs on plain CPython, blender is not needed.
+# Usage:
+#   python benchmarks/release_benchmark.py --output result.json
+#   python benchmarks/release_benchmark.py --baseline result.json --output new_result.json
+# 发布流程的性能测试，不需要安装Blender
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+from common.io.FileManagerClient import get_md5_folder  # noqa: E402
+from common.io.folder_signature import FolderSignature  # noqa: E402
+from workspace_generator import WorkspaceConfig, generate_workspace  # noqa: E402
+
+
+# main.py resolves the blender addon folder and installs fake-bpy-module when imported, neither is needed here.
+# Import it with those steps disabled and point its workspace paths to the synthetic workspace.
+def load_framework(workspace: str, output_root: str):
+    from common.class_loader import module_installer
+    module_installer.default_blender_addon_path = lambda blender_path: os.path.join(output_root, "blender_addons")
+    module_installer.install_fake_bpy = lambda blender_path: None
+    import main
+    main.PROJECT_ROOT = workspace
+    main.ADDON_ROOT = os.path.join(workspace, "addons")
+    main.CACHE_DIR = os.path.join(workspace, ".addon_cache")
+    main.IMPORT_CACHE_FILE = os.path.join(main.CACHE_DIR, "imports.json")
+    main.WHEEL_STORE_DIR = os.path.join(main.CACHE_DIR, "wheels")
+    main.TRANSFORM_CACHE_DIR = os.path.join(main.CACHE_DIR, "transforms")
+    main.RELEASE_CACHE_DIR = os.path.join(main.CACHE_DIR, "releases")
+    # the stages measure the build, the release cache is measured by its own stage
+    main.RELEASE_CACHE_ENABLED = False
+    main.TEST_RELEASE_DIR = os.path.join(output_root, "addon_test")
+    main.BLENDER_ADDON_PATH = os.path.join(output_root, "blender_addons")
+    main._import_cache = None
+    main._wheel_store = None
+    main._release_cache = None
+    main._folder_signatures = {}
+    return main
+
+
+def clear_import_cache(main):
+    if os.path.exists(main.CACHE_DIR):
+        shutil.rmtree(main.CACHE_DIR)
+    main._import_cache = None
+    main._wheel_store = None
+    main._release_cache = None
+    main._folder_signatures = {}
+
+
+def time_stage(repeat: int, run, setup=None) -> dict:
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+
+def run_benchmark(config: WorkspaceConfig, repeat: int, output_root: str) -> dict:
+    workspace = os.path.join(output_root, "workspace")
+    release_dir = os.path.join(output_root, "addon_release")
+    os.makedirs(release_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    addon_names = generate_workspace(workspace, config)
+    generate_time = time.perf_counter() - start
+    main = load_framework(workspace, output_root)
+    addon_name = addon_names[0]
+    init_file = main.get_init_file_path(addon_name)
+    entry_files = main.get_addon_entry_files([addon_name])
+    staging_folder = os.path.join(output_root, "staging", addon_name)
+
+    def copy_addon_files():
+        if os.path.exists(staging_folder):
+            shutil.rmtree(staging_folder)
+        os.makedirs(staging_folder)
+        for rel_path, file in main.collect_release_files(init_file, addon_name).items():
+            target_file = os.path.join(staging_folder, rel_path)
+            os.makedirs(os.path.dirname(target_file), exist_ok=True)
+            shutil.copyfile(file, target_file)
+
+    def clear_test_build():
+        for folder in (main.TEST_RELEASE_DIR, main.BLENDER_ADDON_PATH):
+            if os.path.exists(folder):
+                shutil.rmtree(folder)
+
+    stages = {}
+    stages["find_all_dependencies_cold"] = time_stage(
+        repeat, lambda: main.find_all_dependencies(entry_files, workspace), setup=lambda: clear_import_cache(main))
+    stages["find_all_dependencies_serial_cold"] = time_stage(
+        repeat, lambda: main.find_all_dependencies(entry_files, workspace, parallel=False),
+        setup=lambda: clear_import_cache(main))
+    stages["find_all_dependencies_warm"] = time_stage(
+        repeat, lambda: main.find_all_dependencies(entry_files, workspace))
+    copy_addon_files()
+    # the digests of files modified in the last seconds are not cached, age the copied files
+    for root, dirnames, filenames in os.walk(staging_folder):
+        for filename in filenames:
+            os.utime(os.path.join(root, filename), (time.time() - 60, time.time() - 60))
+    stages["get_md5_folder"] = time_stage(repeat, lambda: get_md5_folder(staging_folder))
+    stages["folder_signature_cold"] = time_stage(repeat, lambda: FolderSignature(staging_folder).compute())
+    warm_signature = FolderSignature(staging_folder)
+    stages["folder_signature_warm"] = time_stage(repeat, warm_signature.compute, setup=warm_signature.compute)
+    stages["release_addon_cold"] = time_stage(
+        repeat, lambda: main.release_addon(init_file, addon_name, release_dir=release_dir),
+        setup=lambda: clear_import_cache(main))
+    stages["release_addon_warm"] = time_stage(
+        repeat, lambda: main.release_addon(init_file, addon_name, release_dir=release_dir))
+    stages["release_addon_cached"] = time_stage(
+        repeat, lambda: main.release_addon(init_file, addon_name, release_dir=release_dir, use_release_cache=True),
+        setup=lambda: main.release_addon(init_file, addon_name, release_dir=release_dir, use_release_cache=True))
+    stages["update_addon_for_test_full"] = time_stage(
+        repeat, lambda: main.update_addon_for_test(init_file, addon_name), setup=clear_test_build)
+    stages["update_addon_for_test_unchanged"] = time_stage(
+        repeat, lambda: main.update_addon_for_test(init_file, addon_name))
+    stages["release_addons_batch"] = time_stage(
+        repeat, lambda: main.release_addons(addon_names, release_dir=release_dir),
+        setup=lambda: clear_import_cache(main))
+
+    return {
+        "config": config.to_dict(),
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "generate_workspace": generate_time,
+        "stages": stages,
+    }
+
+
+# Returns the stages whose median time grew more than threshold times compared to the baseline
+def compare_with_baseline(result: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for stage, timing in sorted(result["stages"].items()):
+        if stage not in baseline.get("stages", {}):
+            print("{:<36} {:>10.4f}s  (no baseline)".format(stage, timing["median"]))
+            continue
+        baseline_median = baseline["stages"][stage]["median"]
+        ratio = timing["median"] / baseline_median if baseline_median > 0 else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print("{:<36} {:>10.4f}s  baseline {:>10.4f}s  x{:.2f}{}".format(
+            stage, timing["median"], baseline_median, ratio, flag))
+        if ratio > threshold:
+            regressions.append(stage)
+    if baseline.get("config") != result["config"]:
+        print("Warning: the baseline was recorded with a different workspace config")
+    return regressions
+
+
+def main_entry(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the addon release pipeline on a synthetic workspace")
+    defaults = WorkspaceConfig()
+    parser.add_argument("--addons", type=int, default=defaults.addons)
+    parser.add_argument("--addon-modules", type=int, default=defaults.addon_modules)
+    parser.add_argument("--common-modules", type=int, default=defaults.common_modules)
+    parser.add_argument("--fanout", type=int, default=defaults.fanout, help="imports per generated module")
+    parser.add_argument("--file-size", type=int, default=defaults.file_size, help="bytes per generated py file")
+    parser.add_argument("--assets", type=int, default=defaults.assets, help="binary assets per addon")
+    parser.add_argument("--asset-size", type=int, default=defaults.asset_size, help="bytes per binary asset")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the result to this json file")
+    parser.add_argument("--baseline", help="compare the result with this json file")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="a stage slower than baseline * threshold is reported as a regression")
+    parser.add_argument("--keep", action="store_true", help="keep the generated workspace")
+    args = parser.parse_args(argv)
+
+    config = WorkspaceConfig(addons=args.addons, addon_modules=args.addon_modules, common_modules=args.common_modules,
+                             fanout=args.fanout, file_size=args.file_size, assets=args.assets,
+                             asset_size=args.asset_size, seed=args.seed)
+    output_root = tempfile.mkdtemp(prefix="addon_benchmark_")
+    try:
+        result = run_benchmark(config, args.repeat, output_root)
+    finally:
+        if args.keep:
+            print("Workspace kept at:", output_root)
+        else:
+            shutil.rmtree(output_root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if len(compare_with_baseline(result, baseline, args.threshold)) > 0:
+            return 1
+    else:
+        for stage, timing in sorted(result["stages"].items()):
+            print("{:<36} {:>10.4f}s".format(stage, timing["median"]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_entry())
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Benchmark of the hot reload of the test session: edits a module of a synthetic addon N times and measures the
+# latency from the file change to the addon reloaded. Blender is replaced by blender_host.py, which runs the same
+# reload agent, so the measured reload only covers importing the synthetic modules.
+# Usage:
+#   python benchmarks/reload_benchmark.py --edits 20 --output result.json
+# 插件热重载延迟的性能测试：修改文件N次，统计从保存到重新加载完成的延迟
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+from release_benchmark import load_framework  # noqa: E402
+from workspace_generator import WorkspaceConfig, generate_workspace  # noqa: E402
+
+
+def start_blender_host(main, addon_name: str, reload_port: int, output_root: str) -> subprocess.Popen:
+    script_file = os.path.join(output_root, "start_up_command.py")
+    with open(script_file, "w", encoding="utf-8") as f:
+        f.write(main.start_up_command.format(addon_name=addon_name, reload_port=reload_port,
+                                             poll_interval=main.RELOAD_POLL_INTERVAL))
+    host = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), "blender_host.py"),
+                             main.BLENDER_ADDON_PATH, script_file],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
+    # the agent listens once the startup script ran
+    for line in host.stdout:
+        if line.strip() == "ready":
+            break
+    threading.Thread(target=lambda: [None for _ in host.stdout], daemon=True).start()
+    return host
+
+
+def run_benchmark(config: WorkspaceConfig, edits: int, interval: float, output_root: str, reload_mode=None) -> dict:
+    workspace = os.path.join(output_root, "workspace")
+    addon_name = generate_workspace(workspace, config)[0]
+    main = load_framework(workspace, output_root)
+    main.RELOAD_LATENCY_FILE = None
+    if reload_mode is not None:
+        main.RELOAD_MODE = reload_mode
+    init_file = main.get_init_file_path(addon_name)
+    edited_file = os.path.join(main.ADDON_ROOT, addon_name, "modules", "mod_0.py")
+
+    reload_port = main.find_free_port()
+    main.update_addon_for_test(init_file, addon_name)
+    host = start_blender_host(main, addon_name, reload_port, output_root)
+    stop_event = threading.Event()
+    watcher = threading.Thread(target=main.start_watch_for_update, args=(init_file, addon_name, stop_event,
+                                                                          reload_port))
+    watcher.start()
+    latency = main.get_reload_latency()
+    timeouts = 0
+    try:
+        # give the observer time to schedule the watched folders
+        time.sleep(0.5)
+        for edit in range(edits):
+            samples = latency.get_summary()["samples"]
+            with open(edited_file, "a", encoding="utf-8") as f:
+                f.write("\nedit_{} = {}\n".format(edit, edit))
+            deadline = time.monotonic() + 30
+            while latency.get_summary()["samples"] == samples and time.monotonic() < deadline:
+                time.sleep(0.005)
+            if latency.get_summary()["samples"] == samples:
+                timeouts += 1
+            time.sleep(interval)
+    finally:
+        stop_event.set()
+        watcher.join()
+        host.stdin.close()
+        host.wait()
+
+    return {
+        "config": config.to_dict(),
+        "edits": edits,
+        "timeouts": timeouts,
+        "reload_mode": main.RELOAD_MODE,
+        "debounce": main.WATCH_DEBOUNCE_SECONDS,
+        "poll_interval": main.RELOAD_POLL_INTERVAL,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency": latency.get_summary(),
+        "summary": latency.format_summary(),
+    }
+
+
+def main_entry(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hot reload latency of the test session")
+    defaults = WorkspaceConfig()
+    parser.add_argument("--edits", type=int, default=20, help="number of edits of an addon module")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between a reload and the next edit")
+    parser.add_argument("--reload-mode", choices=["full", "selective"], help="RELOAD_MODE of the test session")
+    parser.add_argument("--addon-modules", type=int, default=defaults.addon_modules)
+    parser.add_argument("--common-modules", type=int, default=defaults.common_modules)
+    parser.add_argument("--fanout", type=int, default=defaults.fanout, help="imports per generated module")
+    parser.add_argument("--file-size", type=int, default=defaults.file_size, help="bytes per generated py file")
+    parser.add_argument("--assets", type=int, default=defaults.assets, help="binary assets per addon")
+    parser.add_argument("--asset-size", type=int, default=defaults.asset_size, help="bytes per binary asset")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", help="write the result to this json file")
+    parser.add_argument("--keep", action="store_true", help="keep the generated workspace")
+    args = parser.parse_args(argv)
+
+    config = WorkspaceConfig(addons=1, addon_modules=args.addon_modules, common_modules=args.common_modules,
+                             fanout=args.fanout, file_size=args.file_size, assets=args.assets,
+                             asset_size=args.asset_size, seed=args.seed)
+    output_root = tempfile.mkdtemp(prefix="reload_benchmark_")
+    try:
+        result = run_benchmark(config, args.edits, args.interval, output_root, args.reload_mode)
+    finally:
+        if args.keep:
+            print("Workspace kept at:", output_root)
+        else:
+            shutil.rmtree(output_root, ignore_errors=True)
+
+    print(result["summary"])
+    if result["timeouts"] > 0:
+        print("Edits without a reload:", result["timeouts"])
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 1 if result["timeouts"] > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_entry())
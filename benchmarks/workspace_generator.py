@@ -0,0 +1,98 @@
+import os
+import random
+
+# Generate a synthetic workspace with the same layout as this framework: addons/<addon>/... and common/<package>/...
+# Common modules import each other (always from a lower index, so there are no cycles) and every addon module imports
+# some common modules. The output only depends on the arguments, the same seed always produces the same workspace.
+# 生成用于性能测试的虚拟工作空间
+
+_MODULES_PER_PACKAGE = 10
+_ASSET_BLOCK_SIZE = 64 * 1024
+
+
+class WorkspaceConfig:
+    def __init__(self, addons=5, addon_modules=20, common_modules=200, fanout=5, file_size=2048, assets=2,
+                 asset_size=1024 * 1024, seed=0):
+        self.addons = addons
+        self.addon_modules = addon_modules
+        self.common_modules = common_modules
+        self.fanout = fanout
+        self.file_size = file_size
+        self.assets = assets
+        self.asset_size = asset_size
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+def common_module_name(index: int) -> str:
+    return "common.lib_{}.mod_{}".format(index // _MODULES_PER_PACKAGE, index)
+
+
+def addon_name(index: int) -> str:
+    return "addon_{}".format(index)
+
+
+def generate_workspace(root: str, config: WorkspaceConfig) -> list:
+    rng = random.Random(config.seed)
+    os.makedirs(root, exist_ok=True)
+    _write(os.path.join(root, "addons", "__init__.py"), "")
+    _write(os.path.join(root, "common", "__init__.py"), "")
+
+    for index in range(config.common_modules):
+        package_folder = os.path.join(root, "common", "lib_{}".format(index // _MODULES_PER_PACKAGE))
+        if index % _MODULES_PER_PACKAGE == 0:
+            _write(os.path.join(package_folder, "__init__.py"), "")
+        imports = rng.sample(range(index), min(index, config.fanout))
+        _write(os.path.join(package_folder, "mod_{}.py".format(index)),
+               _module_source(index, [common_module_name(i) for i in imports], config.file_size))
+
+    addon_names = []
+    for index in range(config.addons):
+        name = addon_name(index)
+        addon_names.append(name)
+        addon_folder = os.path.join(root, "addons", name)
+        module_names = []
+        for module_index in range(config.addon_modules):
+            imports = rng.sample(range(config.common_modules), min(config.common_modules, config.fanout))
+            module_names.append("addons.{}.modules.mod_{}".format(name, module_index))
+            _write(os.path.join(addon_folder, "modules", "mod_{}.py".format(module_index)),
+                   _module_source(module_index, [common_module_name(i) for i in imports], config.file_size))
+        _write(os.path.join(addon_folder, "modules", "__init__.py"), "")
+        _write(os.path.join(addon_folder, "config.py"),
+               "import os\n\n__addon_name__ = os.path.basename(os.path.dirname(__file__))\n")
+        init_imports = ["from addons.{}.config import __addon_name__".format(name)]
+        init_imports.extend("import {}".format(module_name) for module_name in module_names)
+        _write(os.path.join(addon_folder, "__init__.py"),
+               "\n".join(init_imports) + "\n\nbl_info = {\"name\": \"" + name + "\"}\n\n\n"
+               "def register():\n    pass\n\n\ndef unregister():\n    pass\n")
+        for asset_index in range(config.assets):
+            asset_file = os.path.join(addon_folder, "assets", "asset_{}.bin".format(asset_index))
+            os.makedirs(os.path.dirname(asset_file), exist_ok=True)
+            # a random block larger than the deflate window, repeated to the asset size, so assets do not compress
+            block = rng.getrandbits(_ASSET_BLOCK_SIZE * 8).to_bytes(_ASSET_BLOCK_SIZE, "little")
+            with open(asset_file, "wb") as f:
+                for offset in range(0, config.asset_size, _ASSET_BLOCK_SIZE):
+                    f.write(block[:config.asset_size - offset])
+    return addon_names
+
+
+def _module_source(index: int, imports: list, file_size: int) -> str:
+    lines = ["from {} import value as value_{}".format(module_name, i) for i, module_name in enumerate(imports)]
+    lines.append("")
+    lines.append("value = {}".format(index))
+    lines.append("")
+    filler_index = 0
+    source = "\n".join(lines) + "\n"
+    while len(source) < file_size:
+        source += "\n\ndef filler_{0}(x):\n    # padding to reach the configured file size\n" \
+                  "    return x * {0} + value\n".format(filler_index)
+        filler_index += 1
+    return source
+
+
+def _write(file_path: str, content: str):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(content)
@@ -47,7 +47,11 @@ def search_files(folder_path: str, post_filter: set) -> list:
 
 
 def get_md5(filename):
-    return hashlib.md5(open(filename, 'rb').read()).hexdigest()
+    md5 = hashlib.md5()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
 
 
 def get_md5_folder(folder_path: str) -> str:
@@ -0,0 +1,107 @@
+import threading
+
+# A queue running the builds of the test session one at a time in a worker thread. A new change cancels the build in
+# progress and replaces the build waiting to run, so at most one build runs and at most one waits, always for the
+# latest state of the files. A build is cancelled at the checkpoints it calls between its stages.
+# 测试构建队列：同一时间只运行一个构建，新的修改会取消正在进行的过期构建
+
+class BuildCancelled(Exception):
+    pass
+
+
+class BuildTask:
+    def __init__(self, args: tuple):
+        self.args = args
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    # Checkpoint between two stages of the build, raise BuildCancelled if a newer build was submitted
+    def check_cancelled(self, stage=None):
+        if self.cancel_event.is_set():
+            raise BuildCancelled("Build cancelled before", stage)
+
+
+class BuildQueue:
+    # build_function: called with the task and the arguments of submit
+    # on_error: called with the task and the exception when a build fails, the errors are printed by default
+    def __init__(self, build_function, on_error=None):
+        self.build_function = build_function
+        self.on_error = on_error
+        self.running = None
+        self.pending = None
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="build_queue", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    # Queue a build with the latest state, cancel the running build and replace the pending one. Returns the task
+    def submit(self, *args) -> BuildTask:
+        task = BuildTask(args)
+        with self._condition:
+            if self.running is not None:
+                self.running.cancel()
+            if self.pending is not None:
+                self.pending.cancel()
+                self.cancelled += 1
+            self.pending = task
+            self._condition.notify_all()
+        return task
+
+    def is_idle(self) -> bool:
+        with self._condition:
+            return self.running is None and self.pending is None
+
+    # Cancel the builds and stop the worker, a running build stops at its next checkpoint
+    def stop(self, wait=True):
+        with self._condition:
+            self._stopped = True
+            for task in (self.running, self.pending):
+                if task is not None:
+                    task.cancel()
+            self._condition.notify_all()
+        if wait and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopped or self.pending is not None)
+                if self._stopped:
+                    self.running = self.pending = None
+                    self._condition.notify_all()
+                    return
+                task = self.pending
+                self.pending = None
+                self.running = task
+            cancelled = False
+            error = None
+            try:
+                self.build_function(task, *task.args)
+            except BuildCancelled:
+                cancelled = True
+            except Exception as e:
+                error = e
+            with self._condition:
+                if error is not None:
+                    self.failed += 1
+                elif cancelled:
+                    self.cancelled += 1
+                else:
+                    self.completed += 1
+                self.running = None
+                self._condition.notify_all()
+            if error is not None:
+                if self.on_error is not None:
+                    self.on_error(task, error)
+                else:
+                    print(error)
@@ -0,0 +1,79 @@
+import concurrent.futures
+import hashlib
+import os
+import threading
+import time
+
+# Incremental signature of a folder: the hash of the relative paths and the contents of all files in the folder.
+# The digest of every file is cached by its size and modification time, so only changed files are read again. Files
+# are hashed with blake2b in chunks, several files in parallel. Renaming a file changes the signature.
+# 文件夹的增量签名：只重新计算大小或修改时间改变的文件，路径也计入签名
+
+_CHUNK_SIZE = 1024 * 1024
+_DIGEST_SIZE = 32
+# a file modified this close to the scan may be modified again within the resolution of its modification time,
+# its digest is not cached
+_RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+# starting the threads costs more than hashing a few small files
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    blake2b = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            blake2b.update(chunk)
+    return blake2b.hexdigest()
+
+
+class FolderSignature:
+    # workers: the number of threads hashing files, None for the default of ThreadPoolExecutor
+    def __init__(self, folder: str, workers=None):
+        self.folder = os.path.abspath(folder)
+        self.workers = workers
+        # relative path -> (size, mtime_ns, digest)
+        self.cache = {}
+        self.hashed_files = 0
+        self._lock = threading.Lock()
+
+    def compute(self) -> str:
+        with self._lock:
+            scan_start_ns = time.time_ns()
+            files = {}
+            for root, dirnames, filenames in os.walk(self.folder):
+                for filename in filenames:
+                    file_path = os.path.join(root, filename)
+                    rel_path = os.path.relpath(file_path, self.folder).replace(os.sep, "/")
+                    stat = os.stat(file_path)
+                    files[rel_path] = (stat.st_size, stat.st_mtime_ns)
+
+            digests = {}
+            to_hash = []
+            for rel_path, (size, mtime_ns) in files.items():
+                cached = self.cache.get(rel_path)
+                if cached is not None and cached[0] == size and cached[1] == mtime_ns:
+                    digests[rel_path] = cached[2]
+                else:
+                    to_hash.append(rel_path)
+            for rel_path, digest in zip(to_hash, self._hash_files(to_hash, files)):
+                digests[rel_path] = digest
+            self.hashed_files = len(to_hash)
+
+            self.cache = {rel_path: files[rel_path] + (digest,) for rel_path, digest in digests.items()
+                          if files[rel_path][1] < scan_start_ns - _RACY_WINDOW_NS}
+            blake2b = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+            for rel_path in sorted(digests):
+                blake2b.update(rel_path.encode("utf-8"))
+                blake2b.update(b"\0")
+                blake2b.update(digests[rel_path].encode("ascii"))
+                blake2b.update(b"\n")
+            return blake2b.hexdigest()
+
+    def _hash_files(self, rel_paths: list, files: dict) -> list:
+        file_paths = [os.path.join(self.folder, rel_path) for rel_path in rel_paths]
+        total_size = sum(files[rel_path][0] for rel_path in rel_paths)
+        if len(file_paths) < 2 or total_size < PARALLEL_MIN_BYTES:
+            return [hash_file(file_path) for file_path in file_paths]
+        # hashlib releases the GIL while hashing large chunks, threads hash files in parallel
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(hash_file, file_paths))
@@ -0,0 +1,199 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+# Incremental folder synchronization used when deploying test builds.
+# A manifest remembers, for each synced file, the stat of the source and of the written target and the md5 of
+# the written content, so that later syncs only copy the files that were added or changed and remove the stale ones.
+# 增量同步：通过清单记录每个文件的状态，只复制新增或修改的文件，并删除已经不存在的文件
+
+_MANIFEST_VERSION = 1
+_TEMP_SUFFIX = ".sync_tmp"
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class SyncResult:
+    def __init__(self):
+        self.copied = []
+        self.removed = []
+        self.unchanged = 0
+        self.bytes_copied = 0
+
+    def has_changes(self) -> bool:
+        return len(self.copied) > 0 or len(self.removed) > 0
+
+
+def md5_of_file(filepath: str) -> str:
+    md5 = hashlib.md5()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def load_manifest(manifest_path: str):
+    if manifest_path is None or not os.path.isfile(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != _MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest_path: str, manifest: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    temp_path = manifest_path + _TEMP_SUFFIX
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, manifest_path)
+
+
+def sync_folder(source_root: str, target_root: str, manifest_path: str, use_hardlinks=False) -> SyncResult:
+    files = {}
+    for root, dirnames, filenames in os.walk(source_root):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            files[os.path.relpath(file_path, source_root)] = file_path
+    return sync_files(files, target_root, manifest_path, use_hardlinks=use_hardlinks)
+
+
+# files: relative path in target_root -> absolute source path
+# transform: optional callable (relative_path, content_bytes) -> content_bytes or None. Files returning None are copied
+#            as is. transform_key must change whenever the transform would produce a different output for the same input
+def sync_files(files: dict, target_root: str, manifest_path: str, transform=None, transform_key="",
+               use_hardlinks=False) -> SyncResult:
+    result = SyncResult()
+    transform_key = hashlib.md5(transform_key.encode("utf-8")).hexdigest()
+    manifest = load_manifest(manifest_path)
+    full_sync = manifest is None or not os.path.isdir(target_root)
+    old_entries = {} if manifest is None else manifest["files"]
+    key_changed = manifest is not None and manifest.get("transform_key") != transform_key
+    new_entries = {}
+    os.makedirs(target_root, exist_ok=True)
+
+    for rel_path in sorted(files):
+        source_path = files[rel_path]
+        rel_key = rel_path.replace(os.sep, "/")
+        target_path = os.path.join(target_root, rel_key)
+        source_stat = os.stat(source_path)
+        target_stat = _stat_or_none(target_path)
+        old_entry = old_entries.get(rel_key)
+
+        if old_entry is not None and target_stat is not None \
+                and (old_entry["source"] == [source_stat.st_size, source_stat.st_mtime_ns]) \
+                and (old_entry["target"] == [target_stat.st_size, target_stat.st_mtime_ns]) \
+                and not (key_changed and old_entry["transformed"]):
+            new_entries[rel_key] = old_entry
+            result.unchanged += 1
+            continue
+
+        content = None
+        if transform is not None:
+            with open(source_path, "rb") as f:
+                content = transform(rel_key, f.read())
+        if content is not None:
+            content_md5 = hashlib.md5(content).hexdigest()
+        else:
+            content_md5 = md5_of_file(source_path)
+
+        if old_entry is None or target_stat is None or old_entry["md5"] != content_md5 \
+                or old_entry["target"] != [target_stat.st_size, target_stat.st_mtime_ns]:
+            _write_target(source_path, target_path, content, use_hardlinks)
+            target_stat = os.stat(target_path)
+            result.copied.append(rel_key)
+            result.bytes_copied += target_stat.st_size
+        else:
+            # the source was touched but the produced content is identical, keep the target untouched
+            result.unchanged += 1
+
+        new_entries[rel_key] = {
+            "source": [source_stat.st_size, source_stat.st_mtime_ns],
+            "target": [target_stat.st_size, target_stat.st_mtime_ns],
+            "md5": content_md5,
+            "transformed": content is not None,
+        }
+
+    for rel_key in old_entries:
+        if rel_key not in new_entries:
+            if _remove_target(os.path.join(target_root, rel_key), target_root):
+                result.removed.append(rel_key)
+
+    if full_sync:
+        # without a manifest we can not tell which files were deployed by us, remove everything unexpected
+        for root, dirnames, filenames in os.walk(target_root):
+            for filename in filenames:
+                rel_key = os.path.relpath(os.path.join(root, filename), target_root).replace(os.sep, "/")
+                if rel_key not in new_entries:
+                    if _remove_target(os.path.join(root, filename), target_root):
+                        result.removed.append(rel_key)
+
+    if manifest is None or result.has_changes() or key_changed or new_entries != old_entries:
+        save_manifest(manifest_path, {"version": _MANIFEST_VERSION, "transform_key": transform_key,
+                                      "files": new_entries})
+    return result
+
+
+def _stat_or_none(path: str):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _write_target(source_path: str, target_path: str, content, use_hardlinks: bool):
+    target_folder = os.path.dirname(target_path)
+    if not os.path.isdir(target_folder):
+        os.makedirs(target_folder)
+    # write to a temporary file first and then replace the target, so that the target never contains partial content
+    # and hard linked files are never modified in place
+    temp_path = target_path + _TEMP_SUFFIX
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    if content is not None:
+        with open(temp_path, "wb") as f:
+            f.write(content)
+    elif use_hardlinks:
+        try:
+            os.link(source_path, temp_path)
+        except OSError:
+            # different drive or file system without hard link support
+            shutil.copyfile(source_path, temp_path)
+    else:
+        # shutil uses zero-copy system calls when the platform supports it
+        shutil.copyfile(source_path, temp_path)
+    os.replace(temp_path, target_path)
+    _remove_cached_bytecode(target_path)
+
+
+def _remove_target(target_path: str, target_root: str) -> bool:
+    if not os.path.isfile(target_path):
+        return False
+    os.remove(target_path)
+    _remove_cached_bytecode(target_path)
+    # remove the parent folders that became empty
+    folder = os.path.dirname(target_path)
+    while os.path.abspath(folder) != os.path.abspath(target_root) and os.path.isdir(folder) \
+            and not os.listdir(folder):
+        os.rmdir(folder)
+        folder = os.path.dirname(folder)
+    return True
+
+
+# The bytecode cache of a replaced module might be considered valid when the new file has the same size and
+# modification second, remove it to make sure python always compiles the new source
+def _remove_cached_bytecode(py_file: str):
+    if not py_file.endswith(".py"):
+        return
+    folder, filename = os.path.split(py_file)
+    pattern = os.path.join(glob.escape(os.path.join(folder, "__pycache__")), glob.escape(filename[:-3]) + ".*.pyc")
+    for pyc_file in glob.glob(pattern):
+        try:
+            os.remove(pyc_file)
+        except OSError:
+            pass
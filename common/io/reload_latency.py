@@ -0,0 +1,109 @@
+import collections
+import json
+import os
+import threading
+import time
+import uuid
+
+# Latency of the hot reload while testing an addon, from saving a file to the new code running in blender.
+# Every update gets a reload id shared by the watcher and the reload agent in blender, each of them records the wall
+# clock time of its stages. The intervals of the last updates are kept in a rolling window for the percentiles.
+# 测试时从保存文件到Blender中插件重新加载完成的延迟统计
+
+STAGE_EVENT = "event"
+STAGE_BUILD_START = "build_start"
+STAGE_BUILD_END = "build_end"
+STAGE_DEPLOY_DONE = "deploy_done"
+STAGE_SIGNAL_SENT = "signal_sent"
+STAGE_SIGNAL_SEEN = "signal_seen"
+STAGE_RELOADED = "reloaded"
+
+# name, from stage, to stage
+INTERVALS = [
+    ("debounce", STAGE_EVENT, STAGE_BUILD_START),
+    ("build", STAGE_BUILD_START, STAGE_BUILD_END),
+    ("deploy", STAGE_BUILD_END, STAGE_DEPLOY_DONE),
+    ("signature", STAGE_DEPLOY_DONE, STAGE_SIGNAL_SENT),
+    ("signal", STAGE_SIGNAL_SENT, STAGE_SIGNAL_SEEN),
+    ("reload", STAGE_SIGNAL_SEEN, STAGE_RELOADED),
+    ("total", STAGE_EVENT, STAGE_RELOADED),
+]
+
+
+# Nearest rank percentile of sorted values
+def percentile(sorted_values: list, percent: float) -> float:
+    if len(sorted_values) == 0:
+        return 0.0
+    rank = max(1, int(-(-len(sorted_values) * percent // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class ReloadLatency:
+    # max_samples: the number of completed reloads kept for the percentiles
+    def __init__(self, max_samples=200):
+        self.samples = collections.deque(maxlen=max_samples)
+        self.pending = {}
+        self._lock = threading.Lock()
+
+    # event_time: the wall clock time of the first file change of the update, returns the reload id
+    def start(self, event_time=None) -> str:
+        reload_id = uuid.uuid4().hex[0:12]
+        with self._lock:
+            self.pending[reload_id] = {STAGE_EVENT: event_time if event_time is not None else time.time()}
+        return reload_id
+
+    # Record the time of a stage, unknown reload ids are ignored
+    def mark(self, reload_id, stage: str, timestamp=None):
+        with self._lock:
+            stages = self.pending.get(reload_id)
+            if stages is not None:
+                stages[stage] = timestamp if timestamp is not None else time.time()
+
+    # The update did not reach blender, e.g. nothing changed or the build failed
+    def discard(self, reload_id):
+        with self._lock:
+            self.pending.pop(reload_id, None)
+
+    # stages: the stages recorded by the reload agent. Returns the completed sample, None if the addon was not reloaded
+    def complete(self, reload_id, stages: dict):
+        with self._lock:
+            sample = self.pending.pop(reload_id, None)
+            if sample is None or stages.get(STAGE_RELOADED) is None:
+                return None
+            sample.update((stage, stages[stage]) for stage in (STAGE_SIGNAL_SEEN, STAGE_RELOADED) if stage in stages)
+            sample["reload_id"] = reload_id
+            sample["mode"] = stages.get("mode")
+            sample["intervals_ms"] = {name: (sample[end] - sample[start]) * 1000 for name, start, end in INTERVALS
+                                      if start in sample and end in sample}
+            self.samples.append(sample)
+            return sample
+
+    def get_summary(self) -> dict:
+        with self._lock:
+            samples = list(self.samples)
+        intervals = {}
+        for name, start, end in INTERVALS:
+            values = sorted(sample["intervals_ms"][name] for sample in samples if name in sample["intervals_ms"])
+            if len(values) > 0:
+                intervals[name] = {"count": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95),
+                                   "max": values[-1]}
+        return {"samples": len(samples), "intervals_ms": intervals}
+
+    def format_summary(self) -> str:
+        summary = self.get_summary()
+        lines = ["Reload latency of the last {} updates:".format(summary["samples"])]
+        for name, values in summary["intervals_ms"].items():
+            lines.append("  {:<10} p50 {:>9.1f} ms  p95 {:>9.1f} ms  max {:>9.1f} ms".format(
+                name, values["p50"], values["p95"], values["max"]))
+        return "\n".join(lines)
+
+    def dump(self, file_path: str):
+        with self._lock:
+            samples = list(self.samples)
+        result = self.get_summary()
+        result["recent"] = samples
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        temp_file = "{}.{}.tmp".format(file_path, threading.get_ident())
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        os.replace(temp_file, file_path)
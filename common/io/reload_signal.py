@@ -0,0 +1,62 @@
+import json
+import os
+import socket
+import threading
+
+# Push the reload messages of the test build to the reload agent running in blender, see start_up_command in main.py.
+# A message is one line of json sent over a new local tcp connection:
+# {"signature": ..., "files": [...], "modules": [...], "reload_id": ...}, modules is null for a full reload.
+# After the reload the agent answers on the same connection with the times it received the message and finished the
+# reload: {"reload_id": ..., "signal_seen": ..., "reloaded": ..., "mode": ...}, reloaded is null if nothing was done.
+# 将插件更新消息推送到Blender中的重载代理
+
+RELOAD_AGENT_HOST = "127.0.0.1"
+
+
+# Returns a tcp port that is currently free on the local host, for the reload agent to listen on
+def find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((RELOAD_AGENT_HOST, 0))
+        return s.getsockname()[1]
+
+
+# files: the relative paths of the files changed in the deployed addon
+# modules: the modules to reload in dependency order, None to reload the whole addon
+# on_reply: called from a background thread with the answer of the agent, None to not wait for the answer
+# Returns False if the agent is not listening, e.g. blender has not started yet or was closed
+def send_reload_message(port: int, signature: str, files: list, modules=None, reload_id=None, on_reply=None,
+                        timeout=1.0, reply_timeout=60.0) -> bool:
+    files = sorted(file_path.replace(os.sep, "/") for file_path in files)
+    message = json.dumps({"signature": signature, "files": files, "modules": modules, "reload_id": reload_id}) + "\n"
+    try:
+        connection = socket.create_connection((RELOAD_AGENT_HOST, port), timeout=timeout)
+    except OSError:
+        return False
+    try:
+        connection.sendall(message.encode("utf-8"))
+        if on_reply is None:
+            connection.close()
+            return True
+        # the agent reads the message until the end of the stream
+        connection.shutdown(socket.SHUT_WR)
+    except OSError:
+        connection.close()
+        return False
+    connection.settimeout(reply_timeout)
+    threading.Thread(target=_receive_reply, args=(connection, on_reply), daemon=True).start()
+    return True
+
+
+def _receive_reply(connection: socket.socket, on_reply):
+    data = b""
+    try:
+        with connection:
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+    except OSError:
+        return
+    if data.strip():
+        on_reply(json.loads(data.decode("utf-8")))
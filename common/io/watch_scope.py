@@ -0,0 +1,38 @@
+import os
+
+# The files and folders watched while testing an addon: the addon folder and the python files it depends on.
+# The folders of the dependencies and their parent folders up to the workspace root are watched without their sub
+# folders, so new modules and packages on the import paths are noticed as well.
+# 测试时监听的范围：插件文件夹及其依赖的py文件，而不是整个工作空间
+
+
+class WatchScope:
+    # folders: watched with all sub folders, files: the dependencies outside of the folders
+    def __init__(self, root: str, folders, files):
+        self.root = os.path.abspath(root)
+        self.folders = sorted(set(os.path.abspath(folder) for folder in folders))
+        self.files = set(os.path.abspath(file_path) for file_path in files)
+
+    # Returns a dict of folder -> recursive, the folders to schedule with the file system observer
+    def get_watched_folders(self) -> dict:
+        watched_folders = {folder: True for folder in self.folders}
+        for file_path in self.files:
+            folder = os.path.dirname(file_path)
+            while folder not in watched_folders and self.is_in_root(folder):
+                if self.is_in_folders(folder):
+                    break
+                watched_folders[folder] = False
+                if folder == self.root:
+                    break
+                folder = os.path.dirname(folder)
+        return watched_folders
+
+    def is_in_root(self, path: str) -> bool:
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def is_in_folders(self, path: str) -> bool:
+        return any(path == folder or path.startswith(folder + os.sep) for folder in self.folders)
+
+    def contains(self, path: str) -> bool:
+        path = os.path.abspath(path)
+        return path in self.files or self.is_in_folders(path)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+# Cache of the released zip files, keyed by a hash of every input of the release: the content of the released files
+# and wheels, the release options and the version of the release tools. A release with the same key is hardlinked from
+# the cache instead of being built again. Old entries are evicted by age and by the total size of the cache.
+# 发布包缓存：所有输入都未改变时直接使用缓存的发布包，不再重新打包
+
+_CACHE_VERSION = 1
+_ZIP_SUFFIX = ".zip"
+
+
+# plan: the dict of the release plan, tool_files: the source files of the tools producing the released content
+def compute_cache_key(plan: dict, tool_files: list) -> str:
+    sha256 = hashlib.sha256()
+    sha256.update(str(_CACHE_VERSION).encode("utf-8"))
+    sha256.update(json.dumps(plan, sort_keys=True).encode("utf-8"))
+    for tool_file in sorted(tool_files):
+        with open(tool_file, "rb") as f:
+            sha256.update(hashlib.sha256(f.read()).digest())
+    return sha256.hexdigest()
+
+
+def link_or_copy(source_path: str, target_path: str):
+    temp_path = target_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        os.link(source_path, temp_path)
+    except OSError:
+        shutil.copyfile(source_path, temp_path)
+    os.replace(temp_path, target_path)
+
+
+class ArtifactCache:
+    # max_age: seconds since the last use of an entry, max_size: total bytes of all entries, None for no limit
+    def __init__(self, cache_dir: str, max_age=None, max_size=None):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + _ZIP_SUFFIX)
+
+    # Hardlink the cached zip of the key to target_path, returns False if the key is not cached
+    def restore(self, key: str, target_path: str) -> bool:
+        cached_path = self.get_path(key)
+        with self._lock:
+            if not os.path.isfile(cached_path):
+                return False
+            link_or_copy(cached_path, target_path)
+            # the access time is not reliable on every file system, the modification time records the last use
+            os.utime(cached_path)
+        return True
+
+    def store(self, key: str, zip_path: str):
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            link_or_copy(zip_path, self.get_path(key))
+
+    # Remove the entries unused for longer than max_age, then the least recently used entries above max_size.
+    # Returns the number of removed entries.
+    def evict(self) -> int:
+        with self._lock:
+            if not os.path.isdir(self.cache_dir):
+                return 0
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(_ZIP_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort(reverse=True)
+            now = time.time()
+            total_size = 0
+            removed = 0
+            for mtime, size, path in entries:
+                total_size += size
+                if (self.max_age is not None and now - mtime > self.max_age) or \
+                        (self.max_size is not None and total_size > self.max_size):
+                    os.remove(path)
+                    total_size -= size
+                    removed += 1
+            return removed
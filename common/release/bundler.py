@@ -0,0 +1,108 @@
+import os
+
+# Bundle mode: the shared modules of a top level package (e.g. common/...) are stored in the package __init__.py and
+# imported from memory, so blender does not need to search and stat a long chain of folders and files when the addon
+# is enabled. Every module keeps its own name, namespace and __file__, so the rewritten imports stay valid.
+# With bytecode, every module is also stored precompiled in the pyc format, so it is not compiled when it is imported.
+# 打包模式：将共享的模块合并到所属顶层包的__init__.py中，启用插件时从内存导入，减少文件系统访问
+
+_BUNDLE_TEMPLATE = '''# This file is generated by the release tool in bundle mode.
+# The modules of this package are stored below and imported from memory.
+import importlib.abc
+import importlib.util
+import marshal
+import os
+import sys
+
+_BUNDLE_MODULES = {modules}
+_BUNDLE_BYTECODE = {bytecode}
+_BUNDLE_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+
+class _BundleImporter(importlib.abc.MetaPathFinder, importlib.abc.InspectLoader):
+    bundle_package = __name__
+
+    def _relative_name(self, fullname):
+        if fullname.startswith(self.bundle_package + "."):
+            return fullname[len(self.bundle_package) + 1:]
+        return None
+
+    def _filename(self, name):
+        parts = name.split(".")
+        if _BUNDLE_MODULES[name][0]:
+            return os.path.join(_BUNDLE_FOLDER, *parts, "__init__.py")
+        return os.path.join(_BUNDLE_FOLDER, *parts[:-1], parts[-1] + ".py")
+
+    def find_spec(self, fullname, path, target=None):
+        name = self._relative_name(fullname)
+        if name is None or name not in _BUNDLE_MODULES:
+            return None
+        is_package = _BUNDLE_MODULES[name][0]
+        spec = importlib.util.spec_from_loader(fullname, self, origin=self._filename(name), is_package=is_package)
+        spec.has_location = True
+        if is_package:
+            spec.submodule_search_locations = [os.path.join(_BUNDLE_FOLDER, *name.split("."))]
+        return spec
+
+    def is_package(self, fullname):
+        return _BUNDLE_MODULES[self._relative_name(fullname)][0]
+
+    def get_source(self, fullname):
+        return _BUNDLE_MODULES[self._relative_name(fullname)][1]
+
+    def get_filename(self, fullname):
+        return self._filename(self._relative_name(fullname))
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        bytecode = _BUNDLE_BYTECODE.get(self._relative_name(module.__name__))
+        # the bytecode is generated with the source, only the python version has to match
+        if bytecode is not None and bytecode[0:4] == importlib.util.MAGIC_NUMBER:
+            code = marshal.loads(bytecode[16:])
+        else:
+            code = compile(self.get_source(module.__name__), module.__spec__.origin, "exec", dont_inherit=True)
+        exec(code, module.__dict__)
+
+
+# replace the importer left by a previous load of this package, e.g. when the addon is reloaded
+sys.meta_path[:] = [finder for finder in sys.meta_path if getattr(finder, "bundle_package", None) != __name__]
+sys.meta_path.insert(0, _BundleImporter())
+{package_source}'''
+
+
+# Returns the top level package a released file is bundled into, or None if the file is kept as is
+def get_bundle_package(rel_path: str, excluded_packages: set):
+    parts = rel_path.replace(os.sep, "/").split("/")
+    if len(parts) < 2 or not parts[-1].endswith(".py") or parts[0] in excluded_packages:
+        return None
+    return parts[0]
+
+
+# sources: path relative to the release root -> python source, all files must belong to the same top level package
+# compile_module: optional function (source bytes, filename) -> pyc content, to store the modules precompiled
+def build_bundle_source(sources: dict, compile_module=None) -> str:
+    modules = {}
+    bytecode = {}
+    package_source = ""
+    for rel_path, source in sources.items():
+        parts = rel_path.replace(os.sep, "/")[:-3].split("/")[1:]
+        is_package = parts[-1] == "__init__"
+        if is_package:
+            parts = parts[:-1]
+        if len(parts) == 0:
+            # the original __init__.py of the top level package is executed after the importer is installed
+            package_source = source
+            continue
+        modules[".".join(parts)] = (is_package, source)
+        if compile_module is not None:
+            bytecode[".".join(parts)] = compile_module(source.encode("utf-8"), rel_path.replace(os.sep, "/"))
+        # folders without __init__.py are namespace packages, keep them importable
+        for i in range(1, len(parts)):
+            modules.setdefault(".".join(parts[:i]), (True, ""))
+
+    modules_literal = "{\n" + "".join("    {!r}: {!r},\n".format(name, modules[name]) for name in sorted(modules)) + "}"
+    bytecode_literal = "{\n" + "".join("    {!r}: {!r},\n".format(name, bytecode[name])
+                                        for name in sorted(bytecode)) + "}"
+    return _BUNDLE_TEMPLATE.format(modules=modules_literal, bytecode=bytecode_literal, package_source=package_source)
@@ -0,0 +1,77 @@
+import importlib.util
+import marshal
+import sys
+
+# Compile the released python files to bytecode, so blender does not need to compile the addon when it is enabled.
+# The bytecode uses checked hash based invalidation (PEP 552): it stays valid after the zip is extracted, no matter
+# which modification time the extracted files get, and python still recompiles a source that was edited later.
+# 将发布的py文件预编译为字节码，Blender启用插件时无需再编译
+
+# The python version shipped with each blender version
+BLENDER_PYTHON_VERSIONS = {
+    "2.93": (3, 9),
+    "3.0": (3, 9),
+    "3.1": (3, 10),
+    "3.2": (3, 10),
+    "3.3": (3, 10),
+    "3.4": (3, 10),
+    "3.5": (3, 10),
+    "3.6": (3, 10),
+    "4.0": (3, 10),
+    "4.1": (3, 11),
+    "4.2": (3, 11),
+    "4.3": (3, 11),
+    "4.4": (3, 11),
+    "4.5": (3, 11),
+}
+
+# The bytecode magic number of the final release of each python version
+PYTHON_MAGIC_NUMBERS = {
+    (3, 9): 3425,
+    (3, 10): 3439,
+    (3, 11): 3495,
+    (3, 12): 3531,
+    (3, 13): 3571,
+}
+
+_FLAG_HASH_BASED = 0b01
+_FLAG_CHECK_SOURCE = 0b10
+
+
+def get_blender_python_version(blender_version: str) -> tuple:
+    if blender_version not in BLENDER_PYTHON_VERSIONS:
+        raise ValueError("Unknown python version of Blender " + str(blender_version) +
+                         ". Please add it to BLENDER_PYTHON_VERSIONS in common/release/bytecode.py")
+    return BLENDER_PYTHON_VERSIONS[blender_version]
+
+
+# Raise an error unless the running interpreter produces bytecode that the target python version can load
+def check_bytecode_target(python_version: tuple):
+    python_version = tuple(python_version[0:2])
+    current_version = tuple(sys.version_info[0:2])
+    if sys.implementation.name != "cpython" or current_version != python_version:
+        raise ValueError("Can not compile bytecode for python {}.{} with {} {}.{}. Please release the addon with the "
+                         "python version of the target Blender.".format(python_version[0], python_version[1],
+                                                                        sys.implementation.name, *current_version))
+    expected_magic = PYTHON_MAGIC_NUMBERS.get(python_version)
+    current_magic = int.from_bytes(importlib.util.MAGIC_NUMBER[0:2], "little")
+    if expected_magic is None or expected_magic != current_magic:
+        raise ValueError("Refuse to ship bytecode with magic number {} for python {}.{}, expected {}. Pre-release "
+                         "interpreters are not supported.".format(current_magic, python_version[0], python_version[1],
+                                                                  expected_magic))
+
+
+# The path of the bytecode of a python file inside the package, e.g. a/b.py -> a/__pycache__/b.cpython-311.pyc
+def get_bytecode_path(py_path: str) -> str:
+    py_path = py_path.replace("\\", "/")
+    folder, filename = py_path.rsplit("/", 1) if "/" in py_path else ("", py_path)
+    pyc_name = filename[:-3] + "." + sys.implementation.cache_tag + ".pyc"
+    return (folder + "/" if folder else "") + "__pycache__/" + pyc_name
+
+
+def compile_bytecode(source: bytes, filename: str, optimize=-1) -> bytes:
+    code = compile(source, filename, "exec", dont_inherit=True, optimize=optimize)
+    header = bytearray(importlib.util.MAGIC_NUMBER)
+    header.extend((_FLAG_HASH_BASED | _FLAG_CHECK_SOURCE).to_bytes(4, "little"))
+    header.extend(importlib.util.source_hash(source))
+    return bytes(header) + marshal.dumps(code)
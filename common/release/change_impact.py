@@ -0,0 +1,60 @@
+import os
+import subprocess
+
+# Find the files affected by a set of changed files through the reverse import graph, so only the addons depending on
+# the changed files need to be released or tested again.
+# 通过反向导入关系找到受修改影响的文件，只重新发布或测试受影响的插件
+
+
+# import_graph: file -> set of the files it imports, as built by build_import_graph
+def reverse_import_graph(import_graph: dict) -> dict:
+    importers = {file_path: set() for file_path in import_graph}
+    for file_path, imported_files in import_graph.items():
+        for imported_file in imported_files:
+            importers.setdefault(imported_file, set()).add(file_path)
+    return importers
+
+
+# Returns the changed files and every file importing one of them, directly or indirectly
+def find_affected_files(changed_files, import_graph: dict) -> set:
+    importers = reverse_import_graph(import_graph)
+    affected_files = set()
+    to_process = [os.path.abspath(file_path) for file_path in changed_files]
+    while to_process:
+        current_file = to_process.pop()
+        if current_file in affected_files:
+            continue
+        affected_files.add(current_file)
+        to_process.extend(importers.get(current_file, set()) - affected_files)
+    return affected_files
+
+
+# Returns the absolute paths of the files changed in the git diff range (e.g. "origin/main...HEAD") under root.
+# Deleted and renamed files are included with their old path.
+def get_git_changed_files(root: str, diff_range: str) -> list:
+    try:
+        command = ["git", "diff", "--name-only", "--no-renames", "--relative", "-z", diff_range]
+        output = subprocess.check_output(command, cwd=root)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise ValueError("Failed to get the changed files of", diff_range, "from git:", e)
+    return sorted(os.path.abspath(os.path.join(root, name)) for name in output.decode("utf-8").split("\0") if name)
+
+
+# Sort the files so every file comes after the files it imports, e.g. to reload modules in dependency order.
+# Files importing each other are sorted by path.
+def sort_by_imports(file_paths, import_graph: dict) -> list:
+    file_paths = set(os.path.abspath(file_path) for file_path in file_paths)
+    sorted_files = []
+    visited = set()
+
+    def visit(file_path):
+        if file_path in visited:
+            return
+        visited.add(file_path)
+        for imported_file in sorted(import_graph.get(file_path, set()) & file_paths):
+            visit(imported_file)
+        sorted_files.append(file_path)
+
+    for file_path in sorted(file_paths):
+        visit(file_path)
+    return sorted_files
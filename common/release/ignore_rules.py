@@ -0,0 +1,142 @@
+import os
+import re
+
+# Gitignore style rules deciding which files are released.
+# Supported syntax: blank lines and # comments, ! to include a file excluded by a previous rule, a trailing / to only
+# match folders, a leading or middle / to anchor the pattern to the folder of the rules, and the wildcards *, ?, [...]
+# and **. The last matching rule wins, and the files in an excluded folder are excluded as well.
+# gitignore格式的发布规则，决定哪些文件会被发布
+
+
+class IgnoreRule:
+    def __init__(self, pattern: str, negated: bool, dir_only: bool, regex):
+        self.pattern = pattern
+        self.negated = negated
+        self.dir_only = dir_only
+        self.regex = regex
+
+
+def parse_rule(line: str):
+    line = line.rstrip("\n").rstrip("\r")
+    if not line.strip() or line.startswith("#"):
+        return None
+    # trailing spaces are ignored unless escaped
+    if not line.endswith("\\ "):
+        line = line.rstrip(" ")
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    line = line.lstrip("/")
+    regex = _translate(line)
+    if not anchored:
+        # a pattern without a slash matches at any depth
+        regex = "(?:.*/)?" + regex
+    return IgnoreRule(line, negated, dir_only, re.compile(regex + "$", re.DOTALL))
+
+
+def _translate(pattern: str) -> str:
+    result = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            result.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            result.append("/.*")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            result.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            result.append("[^/]*")
+        elif char == "?":
+            result.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                result.append("\\[")
+            else:
+                content = pattern[i + 1:end]
+                if content.startswith("!"):
+                    content = "^" + content[1:]
+                result.append("[" + content.replace("\\", "\\\\") + "]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            result.append(re.escape(pattern[i]))
+        else:
+            result.append(re.escape(char))
+        i += 1
+    return "".join(result)
+
+
+class IgnoreRules:
+    def __init__(self, lines=()):
+        self.rules = []
+        self.extend(lines)
+
+    def extend(self, lines):
+        for line in lines:
+            rule = parse_rule(line)
+            if rule is not None:
+                self.rules.append(rule)
+
+    # Returns True if excluded, False if included by a ! rule, None if no rule matches
+    def match(self, rel_path: str, is_dir=False):
+        result = None
+        for rule in self.rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(rel_path):
+                result = not rule.negated
+        return result
+
+    # Like match, for a file path relative to the folder of the rules. A file in an excluded folder is excluded.
+    def match_file(self, rel_path: str):
+        parts = rel_path.replace(os.sep, "/").split("/")
+        for i in range(1, len(parts)):
+            if self.match("/".join(parts[:i]), is_dir=True):
+                return True
+        return self.match("/".join(parts))
+
+    def is_ignored(self, rel_path: str) -> bool:
+        return bool(self.match_file(rel_path))
+
+
+# Rules of several folders, e.g. the workspace and the addon. The rules of a later folder override the earlier ones.
+class ReleaseFilter:
+    def __init__(self):
+        self.folders = []
+
+    def add(self, folder: str, rules: IgnoreRules):
+        self.folders.append((os.path.abspath(folder), rules))
+
+    def is_ignored(self, file_path: str) -> bool:
+        file_path = os.path.abspath(file_path)
+        ignored = False
+        for folder, rules in self.folders:
+            if not file_path.startswith(folder + os.sep):
+                continue
+            matched = rules.match_file(os.path.relpath(file_path, folder))
+            if matched is not None:
+                ignored = matched
+        return ignored
+
+
+def load_ignore_rules(rules_file: str, default_lines=()) -> IgnoreRules:
+    rules = IgnoreRules(default_lines)
+    if os.path.isfile(rules_file):
+        with open(rules_file, "r", encoding="utf-8") as f:
+            rules.extend(f.read().splitlines())
+    return rules
@@ -0,0 +1,102 @@
+import ast
+import hashlib
+import json
+import os
+
+# Find the modules imported by python files, with a persistent cache so unchanged files are not parsed again.
+# 分析py文件中导入的模块，使用持久化缓存避免重复解析未修改的文件
+
+_CACHE_VERSION = 1
+
+
+def parse_imported_modules(content: str, file_path="<unknown>") -> set:
+    root = ast.parse(content, filename=file_path)
+
+    imported_modules = set()
+    for node in ast.walk(root):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imported_modules.add(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module:
+                module_name = node.module
+                imported_modules.add(module_name)
+            for alias in node.names:
+                if node.module:
+                    imported_modules.add(f"{node.module}.{alias.name}")
+                else:
+                    imported_modules.add(alias.name)
+
+    return imported_modules
+
+
+# Cache of the imported modules of each file, keyed by the absolute path.
+# An entry is reused when size and mtime are unchanged, or when the content md5 is unchanged (e.g. the file was only
+# touched or restored by git).
+class ImportCache:
+    def __init__(self, cache_file: str):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        self.entries = {}
+        if not os.path.isfile(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == _CACHE_VERSION:
+            self.entries = data.get("files", {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        # forget the files that no longer exist
+        self.entries = {path: entry for path, entry in self.entries.items() if os.path.isfile(path)}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+        temp_file = self.cache_file + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": _CACHE_VERSION, "files": self.entries}, f)
+        os.replace(temp_file, self.cache_file)
+        self.dirty = False
+
+    # Returns None when the file needs to be parsed again
+    def get_cached_modules(self, file_path):
+        file_path = os.path.abspath(file_path)
+        entry = self.entries.get(file_path)
+        if entry is None:
+            return None
+        stat = os.stat(file_path)
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return set(entry["modules"])
+
+        with open(file_path, 'rb') as f:
+            content_md5 = hashlib.md5(f.read()).hexdigest()
+        if entry["md5"] != content_md5:
+            return None
+        self.store(file_path, stat.st_size, stat.st_mtime_ns, content_md5, entry["modules"])
+        return set(entry["modules"])
+
+    def store(self, file_path, size, mtime_ns, content_md5, modules):
+        self.entries[os.path.abspath(file_path)] = {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "md5": content_md5,
+            "modules": sorted(modules),
+        }
+        self.dirty = True
+
+
+# Read and parse a single file. This is a module level function so it can be used by a process pool, the result can
+# be passed to ImportCache.store directly
+def read_and_parse_imports(file_path):
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    with open(file_path, 'rb') as f:
+        raw_content = f.read()
+    modules = parse_imported_modules(raw_content.decode('utf-8'), file_path)
+    return file_path, stat.st_size, stat.st_mtime_ns, hashlib.md5(raw_content).hexdigest(), sorted(modules)
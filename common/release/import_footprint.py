@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+# Measure the import footprint of a released addon: every module of the released zip is imported in a separate python
+# process against a stub of the blender modules, recording the import time and the allocated memory of every module. Heavy modules
+# imported at the top level of the addon files are reported, they slow down the start of blender even when the addon
+# is never used and are better imported inside the functions using them.
+# 测量发布插件的导入耗时和内存，找出插件顶层导入的重量级模块
+
+_PROBE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_probe.py")
+_REPORT_SUFFIX = ".imports.json"
+
+
+def get_report_path(zip_path: str) -> str:
+    return os.path.splitext(zip_path)[0] + _REPORT_SUFFIX
+
+
+# Import the package and all other modules in the released zip and return the report of the probe.
+# The python of the release tool is used, which may differ from the python version bundled with blender.
+# blender_version: e.g. "4.1", the value of bpy.app.version in the stub
+def measure_import_footprint(zip_path: str, package_name: str, blender_version: str, timeout=120) -> dict:
+    temp_dir = tempfile.mkdtemp(prefix="import_footprint_")
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zip_file:
+            zip_file.extractall(temp_dir)
+        report_file = os.path.join(temp_dir, "report.json")
+        # -I keeps the folder of the probe and the user environment out of sys.path
+        command = [sys.executable, "-I", _PROBE_FILE, temp_dir, package_name, report_file, blender_version]
+        try:
+            subprocess.run(command, cwd=temp_dir, timeout=timeout, check=True, stdout=subprocess.PIPE,
+                           stderr=subprocess.PIPE)
+        except subprocess.TimeoutExpired:
+            raise ValueError("Importing the released addon", package_name, "took longer than", timeout, "seconds")
+        except subprocess.CalledProcessError as e:
+            raise ValueError("Failed to measure the import footprint of", package_name,
+                             e.stderr.decode("utf-8", errors="replace"))
+        with open(report_file, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        for module in report["modules"]:
+            if module["file"] is not None and module["file"].startswith(temp_dir + os.sep):
+                module["file"] = os.path.relpath(module["file"], temp_dir).replace(os.sep, "/")
+        return report
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _is_in_package(module_name, package_name: str) -> bool:
+    return module_name is not None and (module_name == package_name or module_name.startswith(package_name + "."))
+
+
+# Returns the modules outside of the addon that are imported directly by an addon module and either are listed in
+# heavy_modules or exceed min_ms or min_memory, sorted by the import time. The modules missing in the python of the
+# release tool are stubs, their time is unknown: they are reported when they are listed in heavy_modules.
+def find_heavy_imports(report: dict, package_name: str, heavy_modules=(), min_ms=None, min_memory=None) -> list:
+    files = {module["name"]: module["file"] for module in report["modules"]}
+    unresolved = set(report["unresolved"])
+    heavy_imports = []
+    for module in report["modules"]:
+        if _is_in_package(module["name"], package_name) or not _is_in_package(module["imported_by"], package_name):
+            continue
+        is_listed = any(_is_in_package(module["name"], name) for name in heavy_modules)
+        if is_listed or (min_ms is not None and module["cumulative_ms"] >= min_ms) or \
+                (min_memory is not None and module["memory_bytes"] >= min_memory):
+            heavy_imports.append({
+                "module": module["name"],
+                "imported_by": module["imported_by"],
+                "file": files.get(module["imported_by"]),
+                "cumulative_ms": module["cumulative_ms"],
+                "memory_bytes": module["memory_bytes"],
+                "unresolved": module["name"].split(".")[0] in unresolved,
+            })
+    heavy_imports.sort(key=lambda heavy_import: heavy_import["cumulative_ms"], reverse=True)
+    return heavy_imports
+
+
+def write_report(report: dict, report_path: str):
+    temp_path = report_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    os.replace(temp_path, report_path)
+
+
+# Returns the reasons the report exceeds the budget, an empty list if it is within the budget.
+# A module failing to import fails the budget, the footprint of the addon is not known.
+def check_budget(report: dict, budget_ms=None, budget_memory=None) -> list:
+    reasons = []
+    for module_name, error in report["errors"].items():
+        reasons.append("importing {} failed with {}".format(module_name, error))
+    if budget_ms is not None and report["total_ms"] > budget_ms:
+        reasons.append("import time {:.1f} ms exceeds the budget of {} ms".format(report["total_ms"], budget_ms))
+    if budget_memory is not None and report["peak_memory_bytes"] > budget_memory:
+        reasons.append("import memory {} bytes exceeds the budget of {} bytes".format(report["peak_memory_bytes"],
+                                                                                      budget_memory))
+    return reasons
+
+
+def format_report(report: dict, top=10) -> str:
+    lines = ["Import footprint: {:.1f} ms, peak memory {:.1f} MiB".format(report["total_ms"],
+                                                                          report["peak_memory_bytes"] / 1048576)]
+    for module_name, error in report["errors"].items():
+        lines.append("  import of {} failed against the blender stub: {}".format(module_name, error))
+    if len(report["unresolved"]) > 0:
+        lines.append("  not installed for the release tool, measured as stubs: " + ", ".join(report["unresolved"]))
+    for heavy_import in report.get("heavy_imports", []):
+        if heavy_import["unresolved"]:
+            lines.append("  heavy import {} in {} (not installed, time unknown)".format(
+                heavy_import["module"], heavy_import["file"] or heavy_import["imported_by"]))
+            continue
+        lines.append("  heavy import {} in {} ({:.1f} ms, {:.1f} MiB)".format(
+            heavy_import["module"], heavy_import["file"] or heavy_import["imported_by"],
+            heavy_import["cumulative_ms"], heavy_import["memory_bytes"] / 1048576))
+    slowest = sorted(report["modules"], key=lambda module: module["self_ms"], reverse=True)[0:top]
+    for module in slowest:
+        lines.append("  {:>8.1f} ms {:>8.1f} KiB  {}".format(module["self_ms"], module["self_memory_bytes"] / 1024,
+                                                             module["name"]))
+    return "\n".join(lines)
@@ -0,0 +1,307 @@
+import importlib
+import importlib.abc
+import importlib.machinery
+import json
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+# Run by import_footprint.py in a separate python process: imports and registers a released addon against a stub of
+# the blender modules, then imports every other module of the release, and records the import time and the allocated
+# memory of every imported module.
+# Usage: python -I import_probe.py <extracted release folder> <package name> <report file> <blender version>
+# 在单独的python进程中导入发布的插件，记录每个模块的导入时间和内存
+
+# the modules only available inside blender, they are replaced by stubs
+STUB_MODULES = ("bpy", "_bpy", "bmesh", "mathutils", "bpy_extras", "bpy_types", "gpu", "gpu_extras", "blf", "bgl",
+                "aud", "idprop", "freestyle", "imbuf", "bl_ui", "bl_operators", "bl_math", "rna_prop_ui")
+# the submodules available as attributes without importing them, e.g. bpy.app.version after import bpy
+STUB_SUBMODULES = {"bpy.app", "bpy.app.handlers", "bpy.app.translations", "bpy.app.timers", "bpy.types", "bpy.props",
+                   "bpy.utils", "bpy.utils.previews", "bpy.ops", "bpy.path", "bpy.msgbus", "bpy.context",
+                   "bpy.data", "bpy_extras.io_utils", "bpy_extras.view3d_utils", "mathutils.geometry",
+                   "mathutils.noise", "mathutils.bvhtree", "mathutils.kdtree", "gpu.types", "gpu.shader", "gpu.state"}
+
+
+class _Stub:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        return _Stub()
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+    def __getitem__(self, key):
+        return _Stub()
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __bool__(self):
+        return True
+
+    def __int__(self):
+        return 0
+
+    def __index__(self):
+        return 0
+
+    def __float__(self):
+        return 0.0
+
+    def __or__(self, other):
+        return self
+
+    def __ror__(self, other):
+        return self
+
+
+class _StubType(type):
+    def __getattr__(cls, name):
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        return _Stub()
+
+
+# The attributes of the stub modules are classes, so they can be used as base classes, in isinstance checks and be
+# called like functions, e.g. class MyOperator(bpy.types.Operator), bpy.props.StringProperty(name="name")
+class _StubClass(_Stub, metaclass=_StubType):
+    is_registered = False
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        if name[0].islower() and self.__name__ + "." + name in STUB_SUBMODULES:
+            return importlib.import_module(self.__name__ + "." + name)
+        value = _StubType(name, (_StubClass,), {"__module__": self.__name__})
+        setattr(self, name, value)
+        return value
+
+
+class _StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def __init__(self, blender_version: tuple):
+        self.blender_version = blender_version
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname.split(".")[0] in STUB_MODULES:
+            return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        module = _StubModule(spec.name)
+        module.__path__ = []
+        if spec.name == "bpy.app":
+            module.version = self.blender_version
+            module.version_string = ".".join(str(number) for number in self.blender_version)
+            module.background = True
+        return module
+
+    def exec_module(self, module):
+        pass
+
+
+# The last finder: modules missing in the python of the release tool, e.g. numpy bundled with blender, are replaced by
+# stubs and reported as unresolved, so the rest of the addon can still be measured. Only the imports of the addon
+# modules are replaced, other modules may rely on the ImportError, e.g. to fall back to another module.
+class _MissingFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def __init__(self, package_name: str, recorder):
+        self.package_name = package_name
+        self.recorder = recorder
+        self.missing = set()
+
+    def find_spec(self, fullname, path, target=None):
+        top_level = fullname.split(".")[0]
+        importer = self.recorder.stack[-1].name if self.recorder.stack else None
+        if top_level == self.package_name or importer is None or importer.split(".")[0] != self.package_name:
+            return None
+        # a missing submodule of an installed package is a real error
+        if "." in fullname and not isinstance(sys.modules.get(top_level), _StubModule):
+            return None
+        self.missing.add(top_level)
+        return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+
+    def create_module(self, spec):
+        module = _StubModule(spec.name)
+        module.__path__ = []
+        return module
+
+    def exec_module(self, module):
+        pass
+
+
+class _Record:
+    def __init__(self, name: str, parent):
+        self.name = name
+        self.parent = parent
+        self.file = None
+        self.cumulative_ns = 0
+        self.children_ns = 0
+        self.memory = 0
+        self.children_memory = 0
+
+
+class _MeasuringLoader:
+    def __init__(self, loader, recorder):
+        self._loader = loader
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._recorder.measure(module, self._loader)
+
+
+class _Recorder(importlib.abc.MetaPathFinder):
+    def __init__(self):
+        self.records = []
+        self.stack = []
+        self._finding = set()
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self._finding:
+            return None
+        self._finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.discard(fullname)
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _MeasuringLoader(spec.loader, self)
+        return spec
+
+    def measure(self, module, loader):
+        parent = self.stack[-1] if self.stack else None
+        record = _Record(module.__name__, parent.name if parent else None)
+        record.file = getattr(module, "__file__", None)
+        self.records.append(record)
+        self.stack.append(record)
+        memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter_ns()
+        try:
+            loader.exec_module(module)
+        finally:
+            record.cumulative_ns = time.perf_counter_ns() - start
+            record.memory = tracemalloc.get_traced_memory()[0] - memory_before
+            self.stack.pop()
+            if parent is not None:
+                parent.children_ns += record.cumulative_ns
+                parent.children_memory += record.memory
+
+
+def _is_in_package(module_name: str, package_name: str) -> bool:
+    return module_name == package_name or module_name.startswith(package_name + ".")
+
+
+def _format_error(error: BaseException) -> str:
+    return "{}: {}".format(type(error).__name__, error)
+
+
+# Returns the names of the python modules in the released package folder, every package before its modules
+def find_package_modules(release_folder: str, package_name: str) -> list:
+    module_names = []
+    for root, dirnames, filenames in os.walk(os.path.join(release_folder, package_name)):
+        dirnames[:] = sorted(dirname for dirname in dirnames if dirname.isidentifier())
+        package_path = os.path.relpath(root, release_folder).split(os.sep)
+        for filename in sorted(filenames, key=lambda name: name != "__init__.py"):
+            if not filename.endswith(".py"):
+                continue
+            module_path = package_path if filename == "__init__.py" else package_path + [filename[:-3]]
+            if all(part.isidentifier() for part in module_path):
+                module_names.append(".".join(module_path))
+    return module_names
+
+
+# Import the modules not imported by the addon itself, e.g. modules only imported inside functions or by register of
+# other addons. The modules bundled into a package by the release tool are listed in _BUNDLE_MODULES of the package.
+# Returns a dict of module name -> error for the modules failing to import
+def import_all_modules(release_folder: str, package_name: str) -> dict:
+    errors = {}
+
+    def import_module(module_name):
+        if module_name in sys.modules:
+            return
+        try:
+            importlib.import_module(module_name)
+        except BaseException as e:
+            errors[module_name] = _format_error(e)
+
+    for module_name in find_package_modules(release_folder, package_name):
+        import_module(module_name)
+    for module_name, module in list(sys.modules.items()):
+        bundle_modules = getattr(module, "_BUNDLE_MODULES", None)
+        if _is_in_package(module_name, package_name) and isinstance(bundle_modules, dict):
+            for bundled_name in sorted(bundle_modules):
+                import_module(module_name + "." + bundled_name)
+    return errors
+
+
+def main(release_folder: str, package_name: str, report_file: str, blender_version: str):
+    sys.path.insert(0, release_folder)
+    version = tuple(int(number) for number in blender_version.split("."))
+    sys.meta_path.insert(0, _StubFinder((version + (0, 0, 0))[0:3]))
+    recorder = _Recorder()
+    sys.meta_path.insert(0, recorder)
+    missing_finder = _MissingFinder(package_name, recorder)
+    sys.meta_path.append(missing_finder)
+
+    errors = {}
+    tracemalloc.start()
+    start = time.perf_counter_ns()
+    try:
+        # blender imports the addon and calls register, the auto loader imports the modules of the addon in register
+        package = importlib.import_module(package_name)
+        if hasattr(package, "register"):
+            package.register()
+    except BaseException as e:
+        errors[package_name] = _format_error(e)
+    # an addon with an empty __init__.py or a custom register imports only some of its modules
+    errors.update(import_all_modules(release_folder, package_name))
+    total_ns = time.perf_counter_ns() - start
+    memory, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = {
+        "python": "{}.{}.{}".format(*sys.version_info[0:3]),
+        "total_ms": total_ns / 1e6,
+        "memory_bytes": memory,
+        "peak_memory_bytes": peak_memory,
+        "error": next(iter(errors.values()), None),
+        "errors": errors,
+        "unresolved": sorted(missing_finder.missing),
+        "modules": [{
+            "name": record.name,
+            "file": record.file,
+            "imported_by": record.parent,
+            "self_ms": (record.cumulative_ns - record.children_ns) / 1e6,
+            "cumulative_ms": record.cumulative_ns / 1e6,
+            "self_memory_bytes": record.memory - record.children_memory,
+            "memory_bytes": record.memory,
+        } for record in recorder.records],
+    }
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:5])
@@ -0,0 +1,112 @@
+import io
+import tokenize
+
+# Rewrite the absolute imports of workspace modules so they are imported from the released addon package, e.g.
+#   from addons.my_addon.config import x  ->  from my_addon.addons.my_addon.config import x
+#   import addons.my_addon.config         ->  import my_addon.addons.my_addon.config; from my_addon import addons
+# The source is tokenized once and only the exact module name spans are edited, strings, comments and the layout of
+# the file are never touched.
+# 单次遍历重写导入语句，只修改模块名所在的位置
+
+_STATEMENT_START_TOKENS = {tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING}
+_IGNORED_TOKENS = {tokenize.NL, tokenize.COMMENT}
+
+
+def rewrite_imports(content: str, namespace: str, modules: set) -> str:
+    lines = io.StringIO(content).readlines()
+    line_offsets = [0]
+    for line in lines:
+        line_offsets.append(line_offsets[-1] + len(line))
+
+    tokens = [token for token in tokenize.generate_tokens(iter(lines).__next__)
+              if token.type not in _IGNORED_TOKENS]
+    edits = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.type == tokenize.NAME and token.string in ("from", "import") and _is_statement_start(tokens, i):
+            if token.string == "from":
+                i = _rewrite_from_import(tokens, i + 1, namespace, modules, edits)
+            else:
+                i = _rewrite_import(tokens, i + 1, namespace, modules, edits)
+        else:
+            i += 1
+
+    if len(edits) == 0:
+        return content
+    pieces = []
+    last_end = 0
+    for start, end, replacement in sorted(edits):
+        start = line_offsets[start[0] - 1] + start[1]
+        pieces.append(content[last_end:start])
+        pieces.append(replacement)
+        last_end = line_offsets[end[0] - 1] + end[1]
+    pieces.append(content[last_end:])
+    return "".join(pieces)
+
+
+def _is_statement_start(tokens: list, index: int) -> bool:
+    if index == 0:
+        return True
+    previous = tokens[index - 1]
+    if previous.type in _STATEMENT_START_TOKENS:
+        return True
+    # simple statements after ";" or on the same line as a compound statement like "if x: import y"
+    return previous.type == tokenize.OP and previous.string in (";", ":")
+
+
+# Read a dotted name starting at index, returns (name, start, end, next index)
+def _read_dotted_name(tokens: list, index: int):
+    if index >= len(tokens) or tokens[index].type != tokenize.NAME:
+        return None, None, None, index
+    name = tokens[index].string
+    start = tokens[index].start
+    end = tokens[index].end
+    index += 1
+    while index + 1 < len(tokens) and tokens[index].string == "." and tokens[index + 1].type == tokenize.NAME:
+        name += "." + tokens[index + 1].string
+        end = tokens[index + 1].end
+        index += 2
+    return name, start, end, index
+
+
+def _rewrite_from_import(tokens: list, index: int, namespace: str, modules: set, edits: list) -> int:
+    # relative imports are kept as is
+    if index < len(tokens) and tokens[index].type == tokenize.OP and tokens[index].string in (".", "..."):
+        return index
+    name, start, end, index = _read_dotted_name(tokens, index)
+    if name is not None and name in modules:
+        edits.append((start, end, namespace + "." + name))
+    return index
+
+
+def _rewrite_import(tokens: list, index: int, namespace: str, modules: set, edits: list) -> int:
+    bound_packages = []
+    statement_end = None
+    while index < len(tokens):
+        name, start, end, index = _read_dotted_name(tokens, index)
+        if name is None:
+            break
+        statement_end = end
+        has_alias = index + 1 < len(tokens) and tokens[index].string == "as" and tokens[index + 1].type == tokenize.NAME
+        if has_alias:
+            statement_end = tokens[index + 1].end
+            index += 2
+        if name in modules:
+            edits.append((start, end, namespace + "." + name))
+            top_package = name.split(".")[0]
+            if not has_alias:
+                # "import a.b" binds the name "a", keep binding it to the package inside the namespace
+                if "." in name:
+                    if top_package not in bound_packages:
+                        bound_packages.append(top_package)
+                else:
+                    edits[-1] = (start, end, namespace + "." + name + " as " + name)
+        if index < len(tokens) and tokens[index].string == ",":
+            index += 1
+        else:
+            break
+    if statement_end is not None and len(bound_packages) > 0:
+        edits.append((statement_end, statement_end, "".join(
+            "; from " + namespace + " import " + package for package in bound_packages)))
+    return index
@@ -0,0 +1,147 @@
+import os
+import threading
+
+# An in-memory index of the folders and python files of the workspace, used to resolve imported module names with
+# set lookups instead of os.path.isdir/isfile calls. A folder is scanned on the first lookup of one of its entries, so
+# folders never looked up, e.g. virtual environments or node_modules in the workspace, are never walked. In watch mode
+# the index is updated from the file system events. Paths outside the workspace, in hidden folders, in __pycache__ or
+# behind symbolic links are not indexed and are checked on the file system. When only a part of the workspace is
+# watched, the paths in the other folders are checked on the file system as well, since their entries may be outdated.
+# 工作空间中文件夹和py文件的内存索引，解析模块路径时无需访问文件系统。文件夹在第一次查找时才扫描
+
+
+def _is_excluded(name: str) -> bool:
+    return name.startswith(".") or name == "__pycache__"
+
+
+class ModuleIndex:
+    def __init__(self, root: str):
+        self.root = os.path.normcase(os.path.abspath(root))
+        # paths relative to root
+        self.dirs = set()
+        self.py_files = set()
+        # folders and links that are not indexed
+        self.unindexed = set()
+        # the folders whose entries are indexed
+        self.scanned = set()
+        # the folders updated from the file system events, with and without their sub folders. None for all folders
+        self.watched_trees = None
+        self.watched_dirs = None
+        self._lock = threading.Lock()
+
+    def isdir(self, path: str) -> bool:
+        rel_path = self._relative(path)
+        if rel_path is None:
+            return os.path.isdir(path)
+        if rel_path == "":
+            return True
+        with self._lock:
+            parent = os.path.dirname(rel_path)
+            if not self._is_watched(parent) or not self._scan(parent):
+                return os.path.isdir(path)
+            if rel_path in self.dirs:
+                return True
+            if rel_path not in self.unindexed:
+                return False
+        return os.path.isdir(path)
+
+    def isfile(self, path: str) -> bool:
+        rel_path = self._relative(path)
+        if rel_path is None or not rel_path.endswith(".py"):
+            return os.path.isfile(path)
+        with self._lock:
+            parent = os.path.dirname(rel_path)
+            if not self._is_watched(parent) or not self._scan(parent):
+                return os.path.isfile(path)
+            return rel_path in self.py_files
+
+    # Update the index after path was created, deleted or modified, the path may be a file or a folder
+    def update(self, path: str):
+        rel_path = self._relative(path)
+        if rel_path is None or rel_path == "":
+            return
+        with self._lock:
+            self._forget(rel_path)
+            # the entries of a folder not scanned yet are read on the first lookup
+            if os.path.dirname(rel_path) not in self.scanned:
+                return
+            full_path = os.path.join(self.root, rel_path)
+            if os.path.islink(full_path) or (os.path.isdir(full_path) and _is_excluded(os.path.basename(rel_path))):
+                self.unindexed.add(rel_path)
+            elif os.path.isdir(full_path):
+                self.dirs.add(rel_path)
+            elif os.path.isfile(full_path) and rel_path.endswith(".py"):
+                self.py_files.add(rel_path)
+
+    # watched_folders: dict of folder -> recursive, the folders watched for file system events from now on.
+    # The folders that were not watched before are scanned again on their next lookup.
+    def set_watched_folders(self, watched_folders: dict):
+        trees = set()
+        dirs = set()
+        for folder, recursive in watched_folders.items():
+            rel_folder = self._relative(folder)
+            if rel_folder is not None:
+                (trees if recursive else dirs).add(rel_folder)
+        with self._lock:
+            outdated = [rel_folder for rel_folder in sorted(trees | dirs) if not self._is_watched(rel_folder)]
+            self.watched_trees = trees
+            self.watched_dirs = dirs
+            for rel_folder in outdated:
+                self._forget_entries(rel_folder)
+
+    # True if the entries of the folder are updated from the file system events
+    def _is_watched(self, rel_folder: str) -> bool:
+        if self.watched_dirs is None or rel_folder in self.watched_dirs:
+            return True
+        while True:
+            if rel_folder in self.watched_trees:
+                return True
+            if rel_folder == "":
+                return False
+            rel_folder = os.path.dirname(rel_folder)
+
+    def _relative(self, path: str):
+        path = os.path.normcase(os.path.abspath(path))
+        if path == self.root:
+            return ""
+        if path.startswith(self.root + os.sep):
+            return path[len(self.root) + 1:]
+        return None
+
+    # Remove the path and everything below it from the index
+    def _forget(self, rel_path: str):
+        for entries in (self.dirs, self.py_files, self.unindexed):
+            entries.discard(rel_path)
+        self._forget_entries(rel_path)
+
+    # Remove everything below the folder from the index, the folder is scanned again on the next lookup
+    def _forget_entries(self, rel_folder: str):
+        prefix = rel_folder + os.sep if rel_folder != "" else ""
+        for entries in (self.dirs, self.py_files, self.unindexed, self.scanned):
+            entries.difference_update([entry for entry in entries if entry.startswith(prefix)])
+        self.scanned.discard(rel_folder)
+
+    # Index the entries of the folder if it was not scanned yet, returns False if the folder is not indexed
+    def _scan(self, rel_folder: str) -> bool:
+        if rel_folder in self.scanned:
+            return True
+        if rel_folder != "":
+            if not self._scan(os.path.dirname(rel_folder)) or rel_folder in self.unindexed:
+                return False
+            if rel_folder not in self.dirs:
+                # the folder does not exist, it has no entries
+                return True
+        try:
+            entries = list(os.scandir(os.path.join(self.root, rel_folder)))
+        except OSError:
+            entries = []
+        for entry in entries:
+            rel_path = os.path.normcase(os.path.join(rel_folder, entry.name) if rel_folder else entry.name)
+            if entry.is_symlink() or (entry.is_dir() and _is_excluded(entry.name)):
+                self.unindexed.add(rel_path)
+            elif entry.is_dir():
+                self.dirs.add(rel_path)
+            elif entry.name.endswith(".py"):
+                self.py_files.add(rel_path)
+        self.scanned.add(rel_folder)
+        return True
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+
+# The release plan lists every entry of a released zip before anything is written: the archive path, the source
+# file, how the file is rewritten, its size and the hash of its content. The plan of each release is stored next to
+# the zip, so the next release (or a dry run) can be compared with it.
+# 发布计划：在写入任何文件之前列出发布包中的所有条目，并保存在发布目录中，用于和下一次发布进行对比
+
+_PLAN_VERSION = 1
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# How the source file is turned into the archive entry
+REWRITE_NONE = "copy"
+REWRITE_IMPORTS = "rewrite_imports"
+REWRITE_BUNDLE = "bundle"
+REWRITE_WHEEL = "wheel"
+
+
+class PlanEntry:
+    # arcname: the path in the zip, for bundled modules the path the module would have without bundling
+    # compiled: a precompiled bytecode file of the entry is released as well
+    def __init__(self, arcname: str, source_path: str, rewrite: str, size: int, sha256: str, compiled=False):
+        self.arcname = arcname.replace(os.sep, "/")
+        self.source_path = source_path
+        self.rewrite = rewrite
+        self.size = size
+        self.sha256 = sha256
+        self.compiled = compiled
+
+    def to_dict(self, source_root: str) -> dict:
+        return {
+            "source": os.path.relpath(self.source_path, source_root).replace(os.sep, "/"),
+            "rewrite": self.rewrite,
+            "size": self.size,
+            "sha256": self.sha256,
+            "compiled": self.compiled,
+        }
+
+
+class ReleasePlan:
+    # source_root: the stored plan contains the source paths relative to this folder
+    def __init__(self, addon_name: str, options: dict, source_root: str):
+        self.addon_name = addon_name
+        self.options = options
+        self.source_root = source_root
+        self.entries = []
+
+    def add(self, entry: PlanEntry):
+        self.entries.append(entry)
+
+    def total_size(self) -> int:
+        return sum(entry.size for entry in self.entries)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": _PLAN_VERSION,
+            "addon": self.addon_name,
+            "options": self.options,
+            "entries": {entry.arcname: entry.to_dict(self.source_root)
+                        for entry in sorted(self.entries, key=lambda e: e.arcname)},
+        }
+
+
+def hash_file(file_path: str) -> tuple:
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+            size += len(chunk)
+    return size, sha256.hexdigest()
+
+
+def get_plan_file(release_dir: str, addon_name: str) -> str:
+    return os.path.join(release_dir, addon_name + ".plan.json")
+
+
+def save_plan(plan: ReleasePlan, plan_file: str):
+    os.makedirs(os.path.dirname(os.path.abspath(plan_file)), exist_ok=True)
+    temp_file = plan_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(plan.to_dict(), f, indent=1)
+    os.replace(temp_file, plan_file)
+
+
+# Returns the stored plan as a dict, or None if there is no plan of a previous release
+def load_plan(plan_file: str):
+    if not os.path.isfile(plan_file):
+        return None
+    try:
+        with open(plan_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != _PLAN_VERSION:
+        return None
+    return data
+
+
+class PlanDiff:
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.options_changed = False
+
+    def has_changes(self) -> bool:
+        return self.options_changed or len(self.added) > 0 or len(self.removed) > 0 or len(self.changed) > 0
+
+
+# old_plan and new_plan are dicts as returned by ReleasePlan.to_dict or load_plan
+def diff_plans(old_plan: dict, new_plan: dict) -> PlanDiff:
+    diff = PlanDiff()
+    old_entries = old_plan.get("entries", {})
+    new_entries = new_plan.get("entries", {})
+    diff.options_changed = old_plan.get("options") != new_plan.get("options")
+    for key in sorted(set(old_entries) | set(new_entries)):
+        if key not in old_entries:
+            diff.added.append(key)
+        elif key not in new_entries:
+            diff.removed.append(key)
+        elif old_entries[key] != new_entries[key]:
+            diff.changed.append(key)
+    return diff
+
+
+def format_plan(plan: ReleasePlan) -> str:
+    lines = []
+    for entry in sorted(plan.entries, key=lambda e: e.arcname):
+        lines.append("{:<60} {:<16} {:>10}  {}  <- {}".format(
+            entry.arcname + (" (+pyc)" if entry.compiled else ""), entry.rewrite, entry.size, entry.sha256[0:12],
+            os.path.relpath(entry.source_path, plan.source_root)))
+    lines.append("{} entries, {} bytes".format(len(plan.entries), plan.total_size()))
+    return "\n".join(lines)
+
+
+def format_diff(diff: PlanDiff, old_plan: dict, new_plan: dict) -> str:
+    if not diff.has_changes():
+        return "No changes since the previous release"
+    lines = []
+    if diff.options_changed:
+        lines.append("~ options: {} -> {}".format(old_plan.get("options"), new_plan.get("options")))
+    for key in diff.added:
+        lines.append("+ " + key)
+    for key in diff.removed:
+        lines.append("- " + key)
+    for key in diff.changed:
+        old_entry = old_plan["entries"][key]
+        new_entry = new_plan["entries"][key]
+        changes = ["{} {} -> {}".format(field, old_entry.get(field), new_entry.get(field))
+                   for field in ("rewrite", "size", "sha256", "compiled", "source")
+                   if old_entry.get(field) != new_entry.get(field)]
+        lines.append("~ {}: {}".format(key, ", ".join(changes)))
+    lines.append("{} added, {} removed, {} changed".format(len(diff.added), len(diff.removed), len(diff.changed)))
+    return "\n".join(lines)
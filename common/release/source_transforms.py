@@ -0,0 +1,236 @@
+import ast
+import hashlib
+import os
+import threading
+import time
+
+from common.release.import_rewriter import rewrite_imports
+
+# A configurable chain of transforms applied to the released python files, e.g. rewriting the imports or removing the
+# docstrings and asserts. Each transform is a function (source, context) -> source. The transformed files are cached
+# by the hash of the content, the transform chain and the context, so unchanged files are not transformed again.
+# The removed statements are replaced by expressions spanning the same lines, the line numbers in tracebacks stay valid.
+# 发布时对py文件执行的一系列源码转换，如重写导入语句、删除文档字符串和断言。转换结果按内容哈希缓存
+
+_CACHE_VERSION = 1
+
+
+class TransformContext:
+    # namespace: the package name of the released addon, modules: the module names of all released python files
+    def __init__(self, rel_path: str, namespace: str, modules: set):
+        self.rel_path = rel_path
+        self.namespace = namespace
+        self.modules = modules
+
+
+class SourceTransform:
+    # version: increase it whenever the function produces a different output, so the cached results are not used
+    # uses_context: the output depends on the namespace and the modules of the release
+    def __init__(self, name: str, func, version=1, uses_context=False):
+        self.name = name
+        self.func = func
+        self.version = version
+        self.uses_context = uses_context
+
+
+def transform_rewrite_imports(source: str, context: TransformContext) -> str:
+    return rewrite_imports(source, context.namespace, context.modules)
+
+
+# Class docstrings are kept, blender uses them as the description of operators, panels and menus
+def transform_strip_docstrings(source: str, context: TransformContext) -> str:
+    root = ast.parse(source, filename=context.rel_path)
+    spans = []
+    for node in ast.walk(root):
+        if not isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef)) or len(node.body) == 0:
+            continue
+        first = node.body[0]
+        if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant) and isinstance(first.value.value, str):
+            # a module can not start with an expression when it has future imports, remove the docstring completely
+            spans.append((first, isinstance(node, ast.Module)))
+    return _replace_statements(source, spans)
+
+
+def transform_drop_asserts(source: str, context: TransformContext) -> str:
+    root = ast.parse(source, filename=context.rel_path)
+    return _replace_statements(source, [(node, False) for node in ast.walk(root) if isinstance(node, ast.Assert)])
+
+
+# Remove the top level if __name__ == "__main__" blocks, they never run inside blender
+def transform_remove_main_blocks(source: str, context: TransformContext) -> str:
+    root = ast.parse(source, filename=context.rel_path)
+    return _replace_statements(source, [(node, False) for node in root.body
+                                        if isinstance(node, ast.If) and len(node.orelse) == 0
+                                        and _is_main_check(node.test)])
+
+
+def _is_main_check(test) -> bool:
+    if not isinstance(test, ast.Compare) or len(test.ops) != 1 or not isinstance(test.ops[0], ast.Eq):
+        return False
+    operands = [test.left, test.comparators[0]]
+    has_name = any(isinstance(operand, ast.Name) and operand.id == "__name__" for operand in operands)
+    has_main = any(isinstance(operand, ast.Constant) and operand.value == "__main__" for operand in operands)
+    return has_name and has_main
+
+
+# spans: list of (statement node, remove). The statements are replaced by (None) spanning the same lines, or by empty
+# lines when remove is True and nothing else follows the statement on its last line.
+def _replace_statements(source: str, spans: list) -> str:
+    if len(spans) == 0:
+        return source
+    # the line numbers of ast only count \n, str.splitlines would also split at form feeds and other separators
+    lines = [line + "\n" for line in source.split("\n")]
+    line_offsets = [0]
+    for line in lines:
+        line_offsets.append(line_offsets[-1] + len(line))
+
+    def offset(lineno, col_offset):
+        # col_offset is a utf-8 byte offset
+        line = lines[lineno - 1]
+        return line_offsets[lineno - 1] + len(line.encode("utf-8")[:col_offset].decode("utf-8"))
+
+    edits = []
+    for node, remove in spans:
+        start = offset(node.lineno, node.col_offset)
+        end = offset(node.end_lineno, node.end_col_offset)
+        newlines = "\n" * (node.end_lineno - node.lineno)
+        rest_of_line = lines[node.end_lineno - 1][end - line_offsets[node.end_lineno - 1]:].strip()
+        if remove and (rest_of_line == "" or rest_of_line.startswith("#")):
+            edits.append((start, end, newlines))
+        else:
+            edits.append((start, end, "(None" + newlines + ")"))
+
+    pieces = []
+    position = 0
+    # nested statements, e.g. an assert inside a removed main block, are covered by the outer edit
+    for start, end, replacement in sorted(edits):
+        if start < position:
+            continue
+        pieces.append(source[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(source[position:])
+    return "".join(pieces)
+
+
+BUILTIN_TRANSFORMS = {
+    "rewrite_imports": SourceTransform("rewrite_imports", transform_rewrite_imports, uses_context=True),
+    "strip_docstrings": SourceTransform("strip_docstrings", transform_strip_docstrings),
+    "drop_asserts": SourceTransform("drop_asserts", transform_drop_asserts),
+    "remove_main_blocks": SourceTransform("remove_main_blocks", transform_remove_main_blocks),
+}
+
+
+class TransformChain:
+    def __init__(self, transforms: list):
+        self.transforms = transforms
+
+    def get_key(self, namespace: str, modules: set) -> str:
+        key = ["{}:{}".format(transform.name, transform.version) for transform in self.transforms]
+        if any(transform.uses_context for transform in self.transforms):
+            key.append(namespace)
+            key.extend(sorted(modules))
+        return hashlib.sha256("\n".join(key).encode("utf-8")).hexdigest()
+
+    def apply(self, source: str, context: TransformContext) -> str:
+        for transform in self.transforms:
+            source = transform.func(source, context)
+        return source
+
+
+# names: the names of BUILTIN_TRANSFORMS or SourceTransform objects, applied in order
+def create_transform_chain(names) -> TransformChain:
+    transforms = []
+    for name in names:
+        if isinstance(name, SourceTransform):
+            transforms.append(name)
+        elif name in BUILTIN_TRANSFORMS:
+            transforms.append(BUILTIN_TRANSFORMS[name])
+        else:
+            raise ValueError("Unknown source transform:", name, "Available transforms:",
+                             ", ".join(sorted(BUILTIN_TRANSFORMS)))
+    return TransformChain(transforms)
+
+
+# Transformed files stored by cache key, one file per entry so the cache can be shared by concurrent releases
+class TransformCache:
+    # max_age: seconds since the last use of an entry, max_size: total bytes of all entries, None for no limit
+    def __init__(self, cache_dir: str, max_age=None, max_size=None):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.max_size = max_size
+
+    # content_sha256: the sha256 hex digest of the file before the transforms
+    @staticmethod
+    def get_key(content_sha256: str, chain_key: str) -> str:
+        key = "{}\n{}\n{}".format(_CACHE_VERSION, content_sha256, chain_key)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[0:2], key)
+
+    def get(self, key: str):
+        try:
+            with open(self.get_path(key), "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+        if self.max_age is not None or self.max_size is not None:
+            # the modification time records the last use, the entries used recently are evicted last
+            try:
+                os.utime(self.get_path(key))
+            except OSError:
+                pass
+        return content
+
+    def put(self, key: str, content: bytes):
+        cache_file = self.get_path(key)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        temp_file = "{}.{}.{}.tmp".format(cache_file, os.getpid(), threading.get_ident())
+        with open(temp_file, "wb") as f:
+            f.write(content)
+        os.replace(temp_file, cache_file)
+
+    # Remove the entries unused for longer than max_age, then the least recently used entries above max_size.
+    # Returns the number of removed entries.
+    def evict(self) -> int:
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        entries = []
+        for folder in os.scandir(self.cache_dir):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort(reverse=True)
+        now = time.time()
+        total_size = 0
+        removed = 0
+        for mtime, size, path in entries:
+            total_size += size
+            if (self.max_age is not None and now - mtime > self.max_age) or \
+                    (self.max_size is not None and total_size > self.max_size):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total_size -= size
+                removed += 1
+        return removed
+
+
+# Read and transform a single file. This is a module level function so it can be used by a process pool.
+# Returns the sha256 of the file content that was read and the transformed content encoded as utf-8.
+def read_and_transform(file_path: str, chain: TransformChain, context: TransformContext) -> tuple:
+    with open(file_path, "rb") as f:
+        content = f.read()
+    return hashlib.sha256(content).hexdigest(), transform_content(content, chain, context)
+
+
+def transform_content(content: bytes, chain: TransformChain, context: TransformContext) -> bytes:
+    try:
+        return chain.apply(content.decode("utf-8"), context).encode("utf-8")
+    except SyntaxError as e:
+        raise SyntaxError(f"Syntax error in file {context.rel_path}: {e}")
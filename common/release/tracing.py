@@ -0,0 +1,135 @@
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+# Low overhead span timing for the release and test stages, written in the Chrome trace event format.
+# Open the trace file in chrome://tracing or https://ui.perfetto.dev
+# When tracing is disabled, a traced function only costs one extra call and a flag check.
+# Only the latest events are kept, so a long test session does not grow the memory or the trace file without limit.
+# 发布和测试流程的耗时追踪，输出为Chrome trace格式
+
+_enabled = False
+_trace_file = None
+DEFAULT_MAX_EVENTS = 100000
+_events = collections.deque(maxlen=DEFAULT_MAX_EVENTS)
+_events_lock = threading.Lock()
+_local = threading.local()
+_start_ns = time.perf_counter_ns()
+
+
+class _Span:
+    def __init__(self, name: str, category: str, args: dict):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start_ns = 0
+
+    def __enter__(self):
+        stack = _get_stack()
+        stack.append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end_ns = time.perf_counter_ns()
+        _get_stack().pop()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        event = {
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": (self.start_ns - _start_ns) / 1000,
+            "dur": (end_ns - self.start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": self.args,
+        }
+        with _events_lock:
+            _events.append(event)
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _get_stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = []
+        _local.stack = stack
+    return stack
+
+
+# max_events: the number of latest events kept, the older events are dropped
+def enable_tracing(trace_file: str, max_events=DEFAULT_MAX_EVENTS):
+    global _enabled, _trace_file, _events
+    with _events_lock:
+        if _events.maxlen != max_events:
+            _events = collections.deque(_events, maxlen=max_events)
+    _trace_file = trace_file
+    _enabled = True
+
+
+# Usage: with trace_span("stage", addon=name) as span: ... span.set(files=10)
+def trace_span(name: str, category="release", **args):
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+# Decorator recording a span for every call of the function
+def traced(name=None, category="release"):
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, category, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Add arguments, e.g. file counts or bytes copied, to the innermost span of the current thread
+def add_trace_args(**args):
+    if not _enabled:
+        return
+    stack = _get_stack()
+    if len(stack) > 0:
+        stack[-1].args.update(args)
+
+
+# Write the recorded events to the trace file
+def write_trace(trace_file=None):
+    trace_file = trace_file or _trace_file
+    if trace_file is None:
+        return
+    with _events_lock:
+        events = list(_events)
+    os.makedirs(os.path.dirname(os.path.abspath(trace_file)), exist_ok=True)
+    temp_file = trace_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    os.replace(temp_file, trace_file)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import zlib
+
+# Content addressed store of the wheels listed in blender_manifest.toml.
+# Every wheel is hashed once: the sha256 and crc32 are cached by path, size and mtime, and the wheel is hardlinked
+# into the store under its sha256. Releases read the wheels from the store, so identical wheels of several addons
+# are only hashed and stored once, and a wheel modified in the store is detected before it is released.
+# 按内容寻址的wheel存储：每个wheel只计算一次哈希，硬链接到存储目录，多个插件共享相同的wheel
+
+_INDEX_VERSION = 1
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class StoredWheel:
+    def __init__(self, name: str, path: str, sha256: str, size: int, crc32: int):
+        # the file name of the wheel, the store path only contains the hash
+        self.name = name
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.crc32 = crc32
+
+
+def hash_file(file_path: str) -> tuple:
+    sha256 = hashlib.sha256()
+    crc = 0
+    size = 0
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+    return sha256.hexdigest(), size, crc & 0xFFFFFFFF
+
+
+class WheelStore:
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.index_file = os.path.join(store_dir, "index.json")
+        # absolute source path -> [size, mtime_ns, sha256]
+        self.sources = {}
+        # sha256 -> [size, crc32, mtime_ns of the stored file]
+        self.blobs = {}
+        self.dirty = False
+        self._lock = threading.RLock()
+        self._verified = set()
+        self.load()
+
+    def load(self):
+        self.sources = {}
+        self.blobs = {}
+        if not os.path.isfile(self.index_file):
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == _INDEX_VERSION:
+            self.sources = data.get("sources", {})
+            self.blobs = data.get("blobs", {})
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            self.sources = {path: entry for path, entry in self.sources.items() if os.path.isfile(path)}
+            os.makedirs(self.store_dir, exist_ok=True)
+            temp_file = self.index_file + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({"version": _INDEX_VERSION, "sources": self.sources, "blobs": self.blobs}, f)
+            os.replace(temp_file, self.index_file)
+            self.dirty = False
+
+    def get_blob_path(self, sha256: str) -> str:
+        return os.path.join(self.store_dir, sha256[0:2], sha256 + ".whl")
+
+    # Hash a wheel without storing it, e.g. to plan a release. The wheel is only hashed when it is new or changed since
+    # it was hashed last time, the index is updated in memory and written by save. Returns a StoredWheel whose path
+    # is the path of the blob, which exists once the wheel is added.
+    def hash(self, wheel_path: str) -> StoredWheel:
+        wheel_path = os.path.abspath(wheel_path)
+        with self._lock:
+            stat = os.stat(wheel_path)
+            entry = self.sources.get(wheel_path)
+            if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns \
+                    and entry[2] in self.blobs:
+                sha256 = entry[2]
+            else:
+                sha256, size, crc = hash_file(wheel_path)
+                self.sources[wheel_path] = [stat.st_size, stat.st_mtime_ns, sha256]
+                if sha256 not in self.blobs:
+                    self.blobs[sha256] = [size, crc, None]
+                self.dirty = True
+            size, crc, _ = self.blobs[sha256]
+            return StoredWheel(os.path.basename(wheel_path), self.get_blob_path(sha256), sha256, size, crc)
+
+    # Add a wheel to the store, the wheel is only hashed when it is new or changed since it was added last time
+    def add(self, wheel_path: str) -> StoredWheel:
+        with self._lock:
+            wheel = self.hash(wheel_path)
+            self._store_blob(os.path.abspath(wheel_path), wheel.sha256)
+            return wheel
+
+    # Check a stored wheel against its cached hash, the file is only hashed again when its stat changed
+    def verify(self, sha256: str, full=False) -> bool:
+        with self._lock:
+            blob_path = self.get_blob_path(sha256)
+            if sha256 not in self.blobs or not os.path.isfile(blob_path):
+                return False
+            size, crc, mtime_ns = self.blobs[sha256]
+            stat = os.stat(blob_path)
+            if not full and stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+                return True
+            actual_sha256, actual_size, actual_crc = hash_file(blob_path)
+            if actual_sha256 != sha256:
+                return False
+            self.blobs[sha256] = [actual_size, actual_crc, stat.st_mtime_ns]
+            self.dirty = True
+            return True
+
+    def _store_blob(self, wheel_path: str, sha256: str) -> str:
+        blob_path = self.get_blob_path(sha256)
+        if sha256 in self._verified:
+            return blob_path
+        if os.path.isfile(blob_path) and not self.verify(sha256):
+            # the stored file was modified, e.g. it was edited through a hardlink of the source
+            os.remove(blob_path)
+        if not os.path.isfile(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            temp_path = blob_path + ".tmp"
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            try:
+                os.link(wheel_path, temp_path)
+            except OSError:
+                shutil.copyfile(wheel_path, temp_path)
+            os.replace(temp_path, blob_path)
+            self.blobs[sha256][2] = os.stat(blob_path).st_mtime_ns
+            self.dirty = True
+            if not self.verify(sha256):
+                raise ValueError("Wheel file changed while adding it to the wheel store:", wheel_path)
+        self._verified.add(sha256)
+        return blob_path
@@ -0,0 +1,255 @@
+import collections
+import concurrent.futures
+import os
+import struct
+import time
+import zlib
+
+# A deterministic zip writer that streams the released files straight from the workspace.
+# Entries are loaded, transformed and compressed in parallel threads (zlib releases the GIL) and written in sorted
+# order with fixed timestamps and permissions, so identical inputs always produce byte-identical zip files.
+# 确定性的zip写入工具：多线程压缩，按顺序写入，使用固定时间戳，相同的输入总会生成完全相同的zip文件
+
+# The earliest timestamp a zip file can store, used unless SOURCE_DATE_EPOCH is set
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+DEFAULT_STREAM_THRESHOLD = 8 * 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIR = struct.Struct("<IHHHHIIH")
+_ZIP_LIMIT = 0xFFFFFFFF
+_ZIP_MAX_ENTRIES = 0xFFFF
+_VERSION = 20
+_UNIX_SYSTEM = 3
+_FLAG_UTF8 = 0x800
+_FILE_MODE = 0o100644
+_DIR_MODE = 0o40755
+_DIR_ATTRIBUTE = 0x10
+_STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+class ZipEntry:
+    # source_path: the file to read, or data: the content of the entry
+    # transform: optional callable (content_bytes) -> content_bytes applied before compressing
+    # compress: False to store the entry without compression, e.g. for already compressed files
+    # crc32: the known crc32 of an uncompressed source file, the file is then streamed to the zip without loading it
+    def __init__(self, arcname: str, source_path=None, data=None, transform=None, compress=True, crc32=None):
+        self.arcname = arcname.replace(os.sep, "/")
+        self.source_path = source_path
+        self.data = data
+        self.transform = transform
+        self.compress = compress
+        self.crc32 = crc32
+
+    def can_stream(self) -> bool:
+        return self.source_path is not None and self.data is None and self.transform is None
+
+    def load(self) -> bytes:
+        if self.data is not None:
+            content = self.data
+        else:
+            with open(self.source_path, "rb") as f:
+                content = f.read()
+        if self.transform is not None:
+            content = self.transform(content)
+        return content
+
+
+def default_date_time() -> tuple:
+    source_date_epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if source_date_epoch:
+        return max(ZIP_EPOCH, time.gmtime(int(source_date_epoch))[0:6])
+    return ZIP_EPOCH
+
+
+# Write the entries to zip_path. Parent folder entries are added automatically.
+# Files of at least stream_threshold bytes without a transform are copied in chunks instead of being loaded in memory.
+# compressed_cache: optional dict of arcname -> CompressedEntry shared by several zips with identical entries of the
+# same name, e.g. the packages of several targets. The compressed data of an entry is copied from the zip written
+# before instead of being compressed again, and like the other entries it is only held in memory while it waits to
+# be written. The zip format limits (4 GiB and 65535 entries, zip64 is not supported) raise a ValueError.
+# Returns the number of bytes of the uncompressed content.
+def write_zip(zip_path: str, entries: list, workers=None, compress_level=6, date_time=None,
+              stream_threshold=DEFAULT_STREAM_THRESHOLD, compressed_cache=None) -> int:
+    date_time = default_date_time() if date_time is None else date_time
+    dos_time = (date_time[3] << 11) | (date_time[4] << 5) | (date_time[5] // 2)
+    dos_date = ((date_time[0] - 1980) << 9) | (date_time[1] << 5) | date_time[2]
+
+    entries_by_name = {}
+    for entry in entries:
+        entries_by_name[entry.arcname] = entry
+        folder = entry.arcname.rsplit("/", 1)[0] if "/" in entry.arcname else ""
+        while folder and folder + "/" not in entries_by_name:
+            entries_by_name[folder + "/"] = None
+            folder = folder.rsplit("/", 1)[0] if "/" in folder else ""
+    names = sorted(entries_by_name)
+    if len(names) > _ZIP_MAX_ENTRIES:
+        raise ValueError("Too many entries for a zip file:", len(names), "the limit without zip64 is",
+                         _ZIP_MAX_ENTRIES, zip_path)
+
+    workers = workers or os.cpu_count() or 1
+    temp_path = zip_path + ".tmp"
+    try:
+        central_directory = _write_entries(temp_path, names, entries_by_name, workers, compress_level,
+                                           stream_threshold, compressed_cache, dos_time, dos_date)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, zip_path)
+
+    total_size = 0
+    for header in central_directory:
+        fields = _CENTRAL_HEADER.unpack_from(header)
+        method, crc, compressed_size, size, name_length, offset = (fields[4], fields[7], fields[8], fields[9],
+                                                                   fields[10], fields[16])
+        total_size += size
+        # the large entries are streamed from their source again instead of being loaded from the zip
+        if compressed_cache is not None and compressed_size < stream_threshold:
+            name = header[_CENTRAL_HEADER.size:].decode("utf-8")
+            compressed_cache[name] = CompressedEntry(zip_path, offset + _LOCAL_HEADER.size + name_length, method, crc,
+                                                     compressed_size, size)
+    return total_size
+
+
+# The location of the compressed data of an entry in a zip written before
+class CompressedEntry:
+    def __init__(self, zip_path: str, data_offset: int, method: int, crc: int, compressed_size: int, size: int):
+        self.zip_path = zip_path
+        self.data_offset = data_offset
+        self.method = method
+        self.crc = crc
+        self.compressed_size = compressed_size
+        self.size = size
+
+    def load(self) -> tuple:
+        with open(self.zip_path, "rb") as f:
+            f.seek(self.data_offset)
+            data = f.read(self.compressed_size)
+        if len(data) != self.compressed_size:
+            raise ValueError("Zip file changed while copying its entries:", self.zip_path)
+        return self.method, self.crc, data, self.size
+
+
+# Returns the central directory headers of the written entries
+def _write_entries(temp_path: str, names: list, entries_by_name: dict, workers: int, compress_level: int,
+                   stream_threshold: int, compressed_cache, dos_time: int, dos_date: int) -> list:
+    central_directory = []
+    with open(temp_path, "wb") as f, concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        name_iter = iter(names)
+        # keep a bounded number of compressed entries in memory
+        for name in name_iter:
+            pending.append((name, _submit_entry(executor, name, entries_by_name[name], compress_level,
+                                                stream_threshold, compressed_cache)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            name, future = pending.popleft()
+            next_name = next(name_iter, None)
+            if next_name is not None:
+                pending.append((next_name, _submit_entry(executor, next_name, entries_by_name[next_name],
+                                                         compress_level, stream_threshold, compressed_cache)))
+            method, crc, data, size = future.result()
+            central_directory.append(_write_local_entry(f, name, method, crc, data, size, dos_time, dos_date,
+                                                        entries_by_name[name], compress_level))
+
+        central_directory_offset = f.tell()
+        central_directory_size = sum(len(header) for header in central_directory)
+        if central_directory_offset + central_directory_size > _ZIP_LIMIT:
+            raise ValueError("Zip file larger than 4 GiB, zip64 is not supported:", temp_path)
+        for header in central_directory:
+            f.write(header)
+        f.write(_END_OF_CENTRAL_DIR.pack(0x06054b50, 0, 0, len(central_directory), len(central_directory),
+                                         central_directory_size, central_directory_offset, 0))
+    return central_directory
+
+
+def _submit_entry(executor, name: str, entry, compress_level: int, stream_threshold: int, compressed_cache):
+    if compressed_cache is not None and name in compressed_cache:
+        return executor.submit(compressed_cache[name].load)
+    return executor.submit(_compress_entry, entry, compress_level, stream_threshold)
+
+
+def _compress_entry(entry, compress_level: int, stream_threshold: int):
+    if entry is None:
+        # folder entry
+        return 0, 0, b"", 0
+    if entry.can_stream():
+        size = os.path.getsize(entry.source_path)
+        if (entry.crc32 is not None and not entry.compress) or size >= stream_threshold:
+            # written by _write_local_entry straight from the source file
+            return None, entry.crc32, None, size
+    content = entry.load()
+    crc = zlib.crc32(content) & 0xFFFFFFFF
+    if entry.compress and len(content) > 0:
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+        compressed = compressor.compress(content) + compressor.flush()
+        if len(compressed) < len(content):
+            return zlib.DEFLATED, crc, compressed, len(content)
+    return 0, crc, content, len(content)
+
+
+def _write_local_entry(f, name: str, method, crc, data, size: int, dos_time: int, dos_date: int, entry=None,
+                       compress_level=6) -> bytes:
+    offset = f.tell()
+    encoded_name = name.encode("utf-8")
+    flags = _FLAG_UTF8 if not name.isascii() else 0
+    is_folder = name.endswith("/")
+    external_attributes = ((_DIR_MODE if is_folder else _FILE_MODE) << 16) | (_DIR_ATTRIBUTE if is_folder else 0)
+    if data is None:
+        method, crc, compressed_size = _stream_entry(f, offset, encoded_name, flags, entry, crc, size, dos_time,
+                                                     dos_date, compress_level)
+    else:
+        compressed_size = len(data)
+        _check_limits(name, size, compressed_size, offset)
+        f.write(_LOCAL_HEADER.pack(0x04034b50, _VERSION, flags, method, dos_time, dos_date, crc, compressed_size,
+                                   size, len(encoded_name), 0))
+        f.write(encoded_name)
+        f.write(data)
+    return _CENTRAL_HEADER.pack(0x02014b50, (_UNIX_SYSTEM << 8) | _VERSION, _VERSION, flags, method, dos_time,
+                                dos_date, crc, compressed_size, size, len(encoded_name), 0, 0, 0, 0, external_attributes,
+                                offset) + encoded_name
+
+
+def _check_limits(name: str, size: int, compressed_size: int, offset: int):
+    if size > _ZIP_LIMIT or compressed_size > _ZIP_LIMIT or offset > _ZIP_LIMIT:
+        raise ValueError("Zip entry beyond the 4 GiB limit, zip64 is not supported:", name)
+
+
+# Copy a large file to the zip in chunks, compressing it on the fly. The local header is written with placeholders and
+# updated once the crc and the compressed size are known. Returns method, crc and compressed size.
+def _stream_entry(f, offset: int, encoded_name: bytes, flags: int, entry, crc, size: int, dos_time: int,
+                  dos_date: int, compress_level: int) -> tuple:
+    _check_limits(entry.arcname, size, size, offset)
+    data_offset = offset + _LOCAL_HEADER.size + len(encoded_name)
+    methods = [zlib.DEFLATED, 0] if entry.compress and size > 0 else [0]
+    for method in methods:
+        f.seek(offset)
+        f.truncate()
+        f.write(_LOCAL_HEADER.pack(0x04034b50, _VERSION, flags, method, dos_time, dos_date, 0, 0, size,
+                                   len(encoded_name), 0))
+        f.write(encoded_name)
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15) if method == zlib.DEFLATED else None
+        actual_crc = 0
+        actual_size = 0
+        with open(entry.source_path, "rb") as source:
+            for chunk in iter(lambda: source.read(_STREAM_CHUNK_SIZE), b""):
+                actual_crc = zlib.crc32(chunk, actual_crc)
+                actual_size += len(chunk)
+                f.write(compressor.compress(chunk) if compressor is not None else chunk)
+        if compressor is not None:
+            f.write(compressor.flush())
+        actual_crc &= 0xFFFFFFFF
+        if actual_size != size or (crc is not None and actual_crc != crc):
+            raise ValueError("File changed while writing the zip:", entry.source_path)
+        compressed_size = f.tell() - data_offset
+        # deflate did not shrink the file, store it instead
+        if method == zlib.DEFLATED and compressed_size >= size:
+            continue
+        _check_limits(entry.arcname, size, compressed_size, offset)
+        f.seek(offset)
+        f.write(_LOCAL_HEADER.pack(0x04034b50, _VERSION, flags, method, dos_time, dos_date, actual_crc,
+                                   compressed_size, size, len(encoded_name), 0))
+        f.seek(0, os.SEEK_END)
+        return method, actual_crc, compressed_size
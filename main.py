@@ -16,18 +16,48 @@
 
 import ast
 import atexit
+import concurrent.futures
+import functools
 import os
 import re
 import shutil
 import subprocess
+import sys
 import threading
 import time
 from datetime import datetime
-from pathlib import Path
 
 from common.class_loader.module_installer import install_if_missing, install_fake_bpy, default_blender_addon_path
-from common.io.FileManagerClient import read_utf8, write_utf8, get_md5_folder, is_subdirectory
+from common.class_loader.module_installer import extract_blender_version
+from common.io.build_queue import BuildCancelled, BuildQueue
+from common.io.FileManagerClient import read_utf8, write_utf8, is_subdirectory
+from common.io.folder_signature import FolderSignature
 from common.io.FileManagerClient import search_files
+from common.io.incremental_sync import sync_files, sync_folder
+from common.io.reload_latency import ReloadLatency, STAGE_BUILD_END, STAGE_BUILD_START, STAGE_DEPLOY_DONE
+from common.io.reload_latency import STAGE_SIGNAL_SENT
+from common.io.reload_signal import find_free_port, send_reload_message
+from common.io.watch_scope import WatchScope
+from common.release.bytecode import check_bytecode_target, compile_bytecode, get_blender_python_version
+from common.release.bytecode import get_bytecode_path
+from common.release import bundler, bytecode, import_rewriter, source_transforms, zip_writer
+from common.release.artifact_cache import ArtifactCache, compute_cache_key
+from common.release.bundler import build_bundle_source, get_bundle_package
+from common.release.change_impact import find_affected_files, get_git_changed_files, sort_by_imports
+from common.release.import_analysis import ImportCache, read_and_parse_imports
+from common.release.ignore_rules import ReleaseFilter, load_ignore_rules
+from common.release.import_footprint import check_budget, find_heavy_imports, format_report, get_report_path
+from common.release.import_footprint import measure_import_footprint, write_report
+from common.release.import_rewriter import rewrite_imports
+from common.release.module_index import ModuleIndex
+from common.release.release_plan import PlanEntry, ReleasePlan, REWRITE_BUNDLE, REWRITE_IMPORTS, REWRITE_NONE
+from common.release.release_plan import REWRITE_WHEEL, diff_plans, format_diff, format_plan, get_plan_file, hash_file
+from common.release.release_plan import load_plan, save_plan
+from common.release.source_transforms import TransformCache, TransformContext, create_transform_chain
+from common.release.source_transforms import read_and_transform
+from common.release.tracing import enable_tracing, write_trace, traced, trace_span, add_trace_args
+from common.release.wheel_store import WheelStore
+from common.release.zip_writer import ZipEntry, default_date_time, write_zip
 
 # The name of current active addon to be created, tested or released
 # 要创建、测试或发布的当前活动插件的名称
@@ -44,7 +74,24 @@ BLENDER_ADDON_PATH = default_blender_addon_path(BLENDER_EXE_PATH)
 # 您可以通过手动设置路径来覆盖默认插件安装路径
 # BLENDER_ADDON_PATH = "C:/software/general/Blender/Blender3.5/3.5/scripts/addons/"
 
-# The files to be ignored when release the addon
+# The files to be ignored when release the addon, in the gitignore format. More rules can be written to a
+# .releaseignore file in the workspace (paths relative to the workspace) and in each addon folder (paths relative to the
+# addon folder), the rules of the addon override the rules of the workspace. Imported python files are always released.
+# 发布插件时忽略的文件，格式与gitignore相同。可以在工作空间和插件文件夹中的.releaseignore文件中添加更多规则
+RELEASE_IGNORE_PATTERNS = [
+    "__pycache__/",
+    "*.py[cod]",
+    "*.blend[0-9]",
+    ".DS_Store",
+    "Thumbs.db",
+    ".releaseignore",
+]
+RELEASE_IGNORE_FILE = ".releaseignore"
+
+# These files are already compressed, they are stored in the zip without compression
+# 这些格式的文件已经是压缩过的，直接存储到zip中不再压缩
+RELEASE_STORED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".zip", ".whl", ".gz", ".7z", ".xz", ".bz2", ".mp3",
+                             ".mp4", ".ogg", ".webm", ".mov"}
 
 PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 
@@ -56,12 +103,125 @@ DEFAULT_RELEASE_DIR = os.path.join(PROJECT_ROOT, "../addon_release/")
 # 测试插件发布的默认目录，不能在当前工作空间内
 TEST_RELEASE_DIR = os.path.join(PROJECT_ROOT, "../addon_test/")
 
-addon_namespace_pattern = re.compile("^[a-zA-Z]+[a-zA-Z0-9_]*$")
+# The transforms applied to the released python files, in order. rewrite_imports is required, the others are optional:
+# strip_docstrings (class docstrings are kept for blender), drop_asserts, remove_main_blocks
+# 发布时对py文件依次执行的源码转换，rewrite_imports是必需的
+RELEASE_SOURCE_TRANSFORMS = ["rewrite_imports"]
+# RELEASE_SOURCE_TRANSFORMS = ["rewrite_imports", "strip_docstrings", "drop_asserts", "remove_main_blocks"]
+
+# The targets released by release_addon_targets, from one dependency analysis:
+# legacy: an addon zip with bl_info for blender 2.93 - 4.1, without blender_manifest.toml and wheels
+# extension: an extension package with blender_manifest.toml and wheels for blender 4.2+
+# 一次发布多个目标：legacy为Blender2.93-4.1使用的bl_info插件，extension为Blender4.2以上使用的扩展
+TARGET_LEGACY = "legacy"
+TARGET_EXTENSION = "extension"
+RELEASE_TARGETS = [TARGET_LEGACY, TARGET_EXTENSION]
+
+# Include precompiled bytecode in the released zip, so Blender does not need to compile the addon when it is enabled.
+# The release must run with the same python version as the Blender of BLENDER_EXE_PATH, otherwise it fails.
+# 在发布的zip中包含预编译的字节码，发布时使用的python版本必须与BLENDER_EXE_PATH对应的Blender一致
+RELEASE_WITH_BYTECODE = False
+
+# Bundle the shared modules of the released addon (e.g. the modules in common) into one file per top level package.
+# The modules are imported from memory, which saves blender many file system lookups when the addon is enabled.
+# The modules of the addon itself are not bundled, since the auto loader searches them in the addon folder.
+# Classes defined in bundled modules are not registered by the auto loader, keep blender classes in the addon folder.
+# 将插件依赖的共享模块按顶层包合并为一个文件，减少Blender启用插件时的文件系统访问
+RELEASE_BUNDLE_SHARED_MODULES = False
+
+# Use hard links instead of copies when deploying the test build into the blender addon folder.
+# Falls back to copying when the test release dir and the blender addon folder are on different drives.
+# 测试时使用硬链接代替复制将插件部署到Blender插件目录，如果不在同一个磁盘上则自动改为复制
+TEST_DEPLOY_USE_HARDLINKS = True
+
+# Only the addon folder and the files imported by the addon are watched. The test build is updated once the watched
+# files did not change for WATCH_DEBOUNCE_SECONDS, so a burst of saves triggers one update. Files changing without a
+# pause are updated at the latest WATCH_MAX_DELAY_SECONDS after the first change.
+# 只监听插件文件夹及其依赖的文件。文件停止修改WATCH_DEBOUNCE_SECONDS秒后更新测试插件，连续的多次保存只更新一次
+WATCH_DEBOUNCE_SECONDS = 0.3
+WATCH_MAX_DELAY_SECONDS = 3.0
+
+# The reload agent started in blender by the test listens on this local tcp port, 0 to pick a free port.
+# The watcher pushes the changed files to the agent as soon as the test build is deployed, and the agent checks the
+# port every RELOAD_POLL_INTERVAL seconds without blocking blender.
+# 测试时Blender中的重载代理监听的本地端口，0表示自动选择。插件部署完成后立即通知Blender重新加载
+RELOAD_AGENT_PORT = 0
+RELOAD_POLL_INTERVAL = 0.1
+# full (default): disable the addon, remove all of its modules and enable it again on every change
+# selective (opt in): only reload the changed modules and the modules importing them in dependency order, and only
+# register the blender classes defined in them again. Falls back to a full reload when the __init__.py of the addon is
+# affected, a non python file changed, or a reloaded module defines property groups or framework classes.
+# full(默认): 每次修改都重新启用整个插件。selective(可选): 只重新加载修改的模块和导入它们的模块，无法局部更新时自动完整重新加载
+RELOAD_FULL = "full"
+RELOAD_SELECTIVE = "selective"
+RELOAD_MODE = RELOAD_FULL
+
+# The cache folder of the framework, it is safe to delete it at any time
+# 框架的缓存目录，可以随时删除
+CACHE_DIR = os.path.join(PROJECT_ROOT, ".addon_cache")
+IMPORT_CACHE_FILE = os.path.join(CACHE_DIR, "imports.json")
+# The wheels listed in blender_manifest.toml are hashed once and hardlinked into this content addressed store
+# wheel文件只计算一次哈希，并以硬链接的方式保存在此目录中
+WHEEL_STORE_DIR = os.path.join(CACHE_DIR, "wheels")
+# The transformed python files are cached by content. Entries unused for TRANSFORM_CACHE_MAX_AGE_DAYS days are removed,
+# then the least recently used ones while the cache is larger than TRANSFORM_CACHE_MAX_SIZE bytes.
+# 转换后的py文件按内容缓存，超过时间或总大小限制的缓存会被删除
+TRANSFORM_CACHE_DIR = os.path.join(CACHE_DIR, "transforms")
+TRANSFORM_CACHE_MAX_AGE_DAYS = 30
+TRANSFORM_CACHE_MAX_SIZE = 256 * 1024 * 1024
+# Reuse the zip of a previous release when the released files, wheels and release options are unchanged.
+# Cached zips unused for RELEASE_CACHE_MAX_AGE_DAYS days are removed, then the least recently used ones while the
+# cache is larger than RELEASE_CACHE_MAX_SIZE bytes.
+# 发布的文件和选项都未改变时直接使用之前的发布包。超过时间或总大小限制的缓存会被删除
+RELEASE_CACHE_ENABLED = True
+RELEASE_CACHE_DIR = os.path.join(CACHE_DIR, "releases")
+RELEASE_CACHE_MAX_AGE_DAYS = 30
+RELEASE_CACHE_MAX_SIZE = 2 * 1024 * 1024 * 1024
+
+# Measure the import footprint of every released zip: the zip is imported in a separate python process against a stub
+# of the blender modules, and a report with the import time and memory of every module is written next to the zip as
+# <zip name>.imports.json. Modules in HEAVY_IMPORT_MODULES, or slower than HEAVY_IMPORT_MIN_MS, imported at the top
+# level of the addon are reported, import them inside the functions using them to speed up the start of blender.
+# The release fails when a module of the addon fails to import, the import takes longer than IMPORT_BUDGET_MS
+# milliseconds or the peak memory is above IMPORT_BUDGET_MEMORY bytes, None for no limit. The python of the release
+# tool is used, not the one of blender. Modules it lacks, e.g. numpy bundled with blender, are replaced by stubs and
+# reported as unresolved, a listed heavy module is reported even if it is missing.
+# 测量发布插件的导入耗时和内存，报告写在zip旁边。导入失败或超过预算时发布失败，None表示不限制
+IMPORT_FOOTPRINT_ENABLED = False
+IMPORT_BUDGET_MS = None
+IMPORT_BUDGET_MEMORY = None
+HEAVY_IMPORT_MODULES = ["numpy", "scipy", "pandas", "matplotlib", "PIL", "cv2", "requests", "xml.dom.minidom",
+                        "multiprocessing", "asyncio", "sqlite3", "tkinter"]
+HEAVY_IMPORT_MIN_MS = 50
+
+# The latency from saving a file to the addon reloaded in blender is measured for the last RELOAD_LATENCY_SAMPLES
+# updates. The percentiles are printed when the test ends and written to RELOAD_LATENCY_FILE after every reload,
+# None to not write them. Call print_reload_latency() to print them at any time.
+# 记录从保存文件到Blender重新加载插件的延迟，测试结束时打印统计结果，并在每次重新加载后写入RELOAD_LATENCY_FILE
+RELOAD_LATENCY_SAMPLES = 200
+RELOAD_LATENCY_FILE = os.path.join(CACHE_DIR, "reload_latency.json")
+
+# Write a trace of the release and test stages to this file, None to disable tracing.
+# The trace uses the chrome trace event format, open it in chrome://tracing or https://ui.perfetto.dev
+# 将发布和测试各阶段的耗时写入此文件，None表示不记录
+TRACE_FILE = None
+# TRACE_FILE = os.path.join(CACHE_DIR, "trace.json")
+# The trace keeps the latest TRACE_MAX_EVENTS spans, the file is rewritten after every update in the test session
+# 只保留最近的TRACE_MAX_EVENTS条记录，测试过程中每次更新后都会重写追踪文件
+TRACE_MAX_EVENTS = 20000
+
+# The number of processes used to parse python files when searching dependencies, None means the number of cpus.
+# A process pool is only started when a search wave has at least PARALLEL_PARSE_MIN_FILES files to parse, small
+# addons are always parsed in the current process since starting the pool would cost more than it saves.
+# 分析依赖时用于解析py文件的进程数，None表示使用cpu核数。只有当需要解析的文件数量足够多时才会启动进程池
+DEPENDENCY_PARSE_WORKERS = None
+PARALLEL_PARSE_MIN_FILES = 64
 
-# The framework use this pattern to find the import module within the workspace
-import_module_pattern = re.compile("from ([a-zA-Z_][a-zA-Z0-9_.]*) import (.+)")
+addon_namespace_pattern = re.compile("^[a-zA-Z]+[a-zA-Z0-9_]*$")
 
-__addon_md5__signature__ = "addon.txt"
+# Manifests used to incrementally update the test build, stored next to the synced folders
+_STAGING_MANIFEST_SUFFIX = ".staging.json"
+_DEPLOY_MANIFEST_SUFFIX = ".deploy.json"
 ADDON_MANIFEST_FILE = "blender_manifest.toml"
 WHEELS_PATH = "wheels"
 
@@ -83,6 +243,10 @@ except ImportError:
     install_if_missing("toml")
     import toml
 
+if TRACE_FILE is not None:
+    enable_tracing(TRACE_FILE, TRACE_MAX_EVENTS)
+    atexit.register(write_trace)
+
 
 def new_addon(addon_name: str):
     new_addon_path = os.path.join(ADDON_ROOT, addon_name)
@@ -110,51 +274,165 @@ def get_init_file_path(addon_name):
 
 
 # https://devtalk.blender.org/t/plugin-hot-reload-by-cleaning-sys-modules/20040
+# The reload agent runs in blender: it listens on a local port for the messages sent by the watcher after the test
+# build is deployed, see common/io/reload_signal.py. The port is polled without blocking in one persistent timer, which
+# survives loading other blend files. The agent is kept in bpy.app.driver_namespace, so there is only one per blender.
 start_up_command = """
 import bpy
-from bpy.app.handlers import persistent
-import os
+import importlib
+import json
+import socket
 import sys
-existing_addon_md5 = ""
+import time
+
 try:
     bpy.ops.preferences.addon_enable(module="{addon_name}")
 except Exception as e:
     print("Addon enable failed:", e)
 
-def watch_update_tick():
-    global existing_addon_md5
-    if os.path.exists("{addon_signature}"):
-        with open("{addon_signature}", "r") as f:
-            addon_md5 = f.read()
-        if existing_addon_md5 == "":
-            existing_addon_md5 = addon_md5
-        elif existing_addon_md5 != addon_md5:
-            print("Addon file changed, start to update the addon")
+
+class AddonReloadAgent:
+    def __init__(self, port):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", port))
+        self.server.listen(8)
+        self.server.setblocking(False)
+        self.connections = []
+        self.signature = None
+
+    # Returns the messages of the connections closed by the watcher with their connections, never blocks
+    def receive_messages(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                break
+            connection.setblocking(False)
+            self.connections.append([connection, b""])
+        received = []
+        for item in list(self.connections):
             try:
-                bpy.ops.preferences.addon_disable(module="{addon_name}")
-                all_modules = sys.modules
-                all_modules = dict(sorted(all_modules.items(),key= lambda x:x[0])) #sort them
-                for k,v in all_modules.items():
-                    if k.startswith("{addon_name}"):
-                        del sys.modules[k]
-                bpy.ops.preferences.addon_enable(module="{addon_name}")
-            except Exception as e:
-                print("Addon update failed:", e)
-            existing_addon_md5 = addon_md5
-            print("Addon updated")
-    return 1.0
-
-@persistent
-def register_watch_update_tick(dummy):
+                while True:
+                    chunk = item[0].recv(65536)
+                    if not chunk:
+                        break
+                    item[1] += chunk
+            except (BlockingIOError, InterruptedError):
+                continue
+            except OSError as e:
+                print("Reload message failed:", e)
+            else:
+                try:
+                    message = json.loads(item[1].decode("utf-8"))
+                    message["signal_seen"] = time.time()
+                    # the connection stays open for the answer
+                    received.append((message, item[0]))
+                    self.connections.remove(item)
+                    continue
+                except ValueError as e:
+                    print("Invalid reload message:", e)
+            item[0].close()
+            self.connections.remove(item)
+        return received
+
+    def tick(self):
+        received = []
+        mode = None
+        try:
+            received = self.receive_messages()
+            # several messages received in one tick are handled by one full reload
+            files = set()
+            signature = self.signature
+            for message, _ in received:
+                files.update(message["files"])
+                signature = message["signature"]
+            if signature != self.signature:
+                self.signature = signature
+                print("Addon file changed, start to update the addon:", ", ".join(sorted(files)))
+                modules = received[0][0].get("modules") if len(received) == 1 else None
+                mode = self.reload_modules(modules) if modules is not None else None
+                if mode is None:
+                    self.reload()
+                    mode = "full"
+                print("Addon updated")
+        except Exception as e:
+            print("Addon update failed:", e)
+            mode = None
+        reloaded = time.time() if mode is not None else None
+        for message, connection in received:
+            self.reply(connection, dict(reload_id=message.get("reload_id"), signal_seen=message["signal_seen"],
+                                        reloaded=reloaded, mode=mode))
+        return {poll_interval}
+
+    def reply(self, connection, answer):
+        try:
+            connection.settimeout(1.0)
+            connection.sendall((json.dumps(answer) + "\\n").encode("utf-8"))
+        except OSError:
+            pass
+        connection.close()
+
+    def reload(self):
+        bpy.ops.preferences.addon_disable(module="{addon_name}")
+        for name in sorted(sys.modules):
+            if name == "{addon_name}" or name.startswith("{addon_name}."):
+                del sys.modules[name]
+        bpy.ops.preferences.addon_enable(module="{addon_name}")
+
+    # Reload the modules in the given order and register the blender classes defined in them again.
+    # Returns None without changing anything when the modules can not be reloaded selectively, otherwise the mode of
+    # the reload that was done.
+    def reload_modules(self, names):
+        auto_load = sys.modules.get("{addon_name}.common.class_loader.auto_load")
+        modules = [sys.modules.get(name) for name in names]
+        if auto_load is None or auto_load.ordered_classes is None or any(module is None for module in modules):
+            return None
+        old_classes = [cls for cls in auto_load.ordered_classes if cls.__module__ in names]
+        framework_classes = [cls for cls in auto_load.frame_work_classes if cls.__module__ in names]
+        # property groups may be used by properties registered outside of the reloaded modules
+        if len(framework_classes) > 0 or any(issubclass(cls, bpy.types.PropertyGroup) for cls in old_classes):
+            return None
+        try:
+            for module in reversed(modules):
+                if hasattr(module, "unregister"):
+                    module.unregister()
+            for cls in reversed(old_classes):
+                if getattr(cls, "is_registered", False):
+                    bpy.utils.unregister_class(cls)
+            for module in modules:
+                importlib.reload(module)
+            # replace the classes of the reloaded modules in the lists of the auto loader, used when it unregisters
+            new_classes = [cls for cls in auto_load.get_ordered_classes_to_register(modules) if cls.__module__ in names]
+            auto_load.ordered_classes = [cls for cls in auto_load.ordered_classes if cls.__module__ not in names]
+            auto_load.ordered_classes.extend(new_classes)
+            auto_load.frame_work_classes = auto_load.get_framework_classes(auto_load.modules)
+            for cls in new_classes:
+                bpy.utils.register_class(cls)
+            for module in modules:
+                if hasattr(module, "register"):
+                    module.register()
+            for cls in auto_load.frame_work_classes:
+                if cls.__module__ in names:
+                    auto_load.register_framework_class(cls)
+            print("Reloaded modules:", ", ".join(names))
+        except Exception as e:
+            print("Selective reload failed, reload the whole addon:", e)
+            self.reload()
+            return "full"
+        return "selective"
+
+
+if "addon_reload_agent" not in bpy.app.driver_namespace:
+    bpy.app.driver_namespace["addon_reload_agent"] = AddonReloadAgent({reload_port})
     print("Watching for addon update...")
-    bpy.app.timers.register(watch_update_tick)
-
-register_watch_update_tick(None)
-bpy.app.handlers.load_post.append(register_watch_update_tick)
+_agent = bpy.app.driver_namespace["addon_reload_agent"]
+if not bpy.app.timers.is_registered(_agent.tick):
+    bpy.app.timers.register(_agent.tick, persistent=True)
 """
 
 
 def start_test(init_file, addon_name, enable_watch=True):
+    reload_port = RELOAD_AGENT_PORT if RELOAD_AGENT_PORT != 0 else find_free_port()
     update_addon_for_test(init_file, addon_name)
     test_addon_path = os.path.join(BLENDER_ADDON_PATH, addon_name)
 
@@ -174,20 +452,21 @@ def start_test(init_file, addon_name, enable_watch=True):
 
     # start_watch_for_update(init_file, addon_name)
     stop_event = threading.Event()
-    thread = threading.Thread(target=start_watch_for_update, args=(init_file, addon_name, stop_event))
+    thread = threading.Thread(target=start_watch_for_update, args=(init_file, addon_name, stop_event, reload_port))
     thread.start()
 
     def exit_handler():
         stop_event.set()
         thread.join()
+        if get_reload_latency().get_summary()["samples"] > 0:
+            print_reload_latency()
         if os.path.exists(test_addon_path):
             shutil.rmtree(test_addon_path)
 
     atexit.register(exit_handler)
 
-    python_script = start_up_command.format(addon_name=addon_name,
-                                            addon_signature=os.path.join(test_addon_path,
-                                                                         __addon_md5__signature__).replace("\\", "/"))
+    python_script = start_up_command.format(addon_name=addon_name, reload_port=reload_port,
+                                            poll_interval=RELOAD_POLL_INTERVAL)
 
     try:
         subprocess.call([BLENDER_EXE_PATH, "--python-expr", python_script])
@@ -195,7 +474,14 @@ def start_test(init_file, addon_name, enable_watch=True):
         exit_handler()
 
 
-def release_addon(target_init_file, addon_name, with_timestamp=False, release_dir=DEFAULT_RELEASE_DIR, need_zip=True):
+# import_graph: optional graph built by build_import_graph to share the analysis between several releases
+# with_bytecode: include precompiled bytecode in the zip, None to use RELEASE_WITH_BYTECODE
+# bundle: bundle the shared modules in the zip, None to use RELEASE_BUNDLE_SHARED_MODULES
+# use_release_cache: reuse the zip of a previous release with the same inputs, None to use RELEASE_CACHE_ENABLED
+# transform_pool: optional LazyProcessPool shared by several releases to transform the python files
+@traced()
+def release_addon(target_init_file, addon_name, with_timestamp=False, release_dir=DEFAULT_RELEASE_DIR, need_zip=True,
+                  import_graph=None, with_bytecode=None, bundle=None, use_release_cache=None, transform_pool=None):
     # if release dir is under PROJECT_ROOT, it's not allowed
     if is_subdirectory(release_dir, PROJECT_ROOT):
         # 不要将插件发布目录设置在当前项目内
@@ -205,144 +491,620 @@ def release_addon(target_init_file, addon_name, with_timestamp=False, release_di
     if not bool(addon_namespace_pattern.match(addon_name)):
         raise ValueError("InValid addon_name:", addon_name, "Please name it as a python package name")
 
+    with_bytecode = RELEASE_WITH_BYTECODE if with_bytecode is None else with_bytecode
+    bundle = RELEASE_BUNDLE_SHARED_MODULES if bundle is None else bundle
+    use_release_cache = RELEASE_CACHE_ENABLED if use_release_cache is None else use_release_cache
+    if need_zip and with_bytecode:
+        check_bytecode_target(get_blender_python_version(extract_blender_version(BLENDER_EXE_PATH)))
+
     if not os.path.isdir(release_dir):
         os.mkdir(release_dir)
 
-    # remove the folder if already exists
     release_folder = os.path.join(release_dir, addon_name)
-    if os.path.exists(release_folder):
-        shutil.rmtree(release_folder)
-    os.mkdir(release_folder)
-    shutil.copyfile(target_init_file, os.path.join(release_folder, "__init__.py"))
+    release_files = collect_release_files(target_init_file, addon_name, import_graph)
+    all_py_modules = find_py_modules_from_paths(release_files.keys())
+    add_trace_args(addon=addon_name, files=len(release_files), need_zip=need_zip)
+
+    def enhance_import(rel_path, content):
+        return enhance_import_for_file_content(rel_path, content, addon_name, all_py_modules)
+
+    if not need_zip:
+        # test builds are updated incrementally, only the changed files are copied and rewritten
+        with trace_span("sync_test_build") as span:
+            sync_result = sync_files(release_files, release_folder, release_folder + _STAGING_MANIFEST_SUFFIX,
+                                     transform=enhance_import,
+                                     transform_key=addon_name + "\n" + "\n".join(sorted(all_py_modules)))
+            span.set(copied=len(sync_result.copied), removed=len(sync_result.removed),
+                     unchanged=sync_result.unchanged, bytes_copied=sync_result.bytes_copied)
+
+    real_addon_name = ("{addon_name}_{timestamp}"
+                       .format(addon_name=release_folder,
+                               timestamp=datetime.now().strftime(
+                                   "%Y%m%d_%H%M%S"))) if with_timestamp else ("{addon_name}"
+                                                                              .format(addon_name=release_folder))
+
+    released_addon_path = os.path.abspath(os.path.join(release_dir, real_addon_name) + ".zip")
+    # zip the addon straight from the workspace files, the imports are rewritten in memory
+    if need_zip:
+        plan = plan_release_files(addon_name, release_files, with_bytecode, bundle)
+        write_release_zip(plan, released_addon_path, get_plan_file(release_dir, addon_name), use_release_cache,
+                          lambda: transform_release_files(plan, all_py_modules, transform_pool))
+
+    return released_addon_path
+
+
+# Write the zip of a release plan, or link it from the release cache when the same plan was released before.
+# get_transformed: callable returning the transformed python files, only called when the zip needs to be built.
+# compressed_cache: optional dict shared by several zips of the same files, so every entry is compressed only once.
+@traced()
+def write_release_zip(plan: ReleasePlan, released_addon_path, plan_file, use_release_cache, get_transformed,
+                      compressed_cache=None):
+    cache_key = get_release_cache_key(plan) if use_release_cache else None
+    # with a timestamp the cached zip is linked to the new name, the build is skipped all the same
+    cache_hit = cache_key is not None and get_release_cache().restore(cache_key, released_addon_path)
+    if cache_hit:
+        add_trace_args(cache_hit=True)
+    else:
+        zip_entries = create_zip_entries(plan, get_transformed())
+        with trace_span("write_zip") as span:
+            content_size = write_zip(released_addon_path, zip_entries, compressed_cache=compressed_cache)
+            span.set(entries=len(zip_entries), content_bytes=content_size,
+                     zip_bytes=os.path.getsize(released_addon_path))
+    # a zip failing the import check is removed, it is neither cached nor recorded as the previous release
+    if IMPORT_FOOTPRINT_ENABLED:
+        try:
+            check_import_footprint(plan.addon_name, released_addon_path)
+        except Exception:
+            os.remove(released_addon_path)
+            raise
+    if cache_key is not None and not cache_hit:
+        get_release_cache().store(cache_key, released_addon_path)
+        get_release_cache().evict()
+    # keep the plan of this release, the next release or dry run is compared with it
+    save_plan(plan, plan_file)
+    # the wheels hashed while planning are only recorded once a release is written
+    get_wheel_store().save()
+    print("Add on released:", released_addon_path)
+
+
+# Write the import footprint report of the released zip, raise an error if it fails to import or exceeds the budget
+@traced()
+def check_import_footprint(addon_name, released_addon_path):
+    blender_version = extract_blender_version(BLENDER_EXE_PATH) or "4.2"
+    report = measure_import_footprint(released_addon_path, addon_name, blender_version)
+    report["addon"] = addon_name
+    report["heavy_imports"] = find_heavy_imports(report, addon_name, HEAVY_IMPORT_MODULES, HEAVY_IMPORT_MIN_MS)
+    reasons = check_budget(report, IMPORT_BUDGET_MS, IMPORT_BUDGET_MEMORY)
+    report["budget_ms"] = IMPORT_BUDGET_MS
+    report["budget_memory_bytes"] = IMPORT_BUDGET_MEMORY
+    report["within_budget"] = len(reasons) == 0
+    report_path = get_report_path(released_addon_path)
+    write_report(report, report_path)
+    add_trace_args(import_ms=report["total_ms"], heavy_imports=len(report["heavy_imports"]))
+    print(format_report(report))
+    if len(reasons) > 0:
+        raise ValueError("The import footprint check of", addon_name, "failed:", "; ".join(reasons),
+                         "See", report_path)
+
+
+# Release the addon for several targets with one dependency analysis, one release plan and one transform pass.
+# The entries shared by the targets are compressed once. Returns a dict of target -> released zip file.
+# targets: the targets to release, None to use RELEASE_TARGETS. The zip of each target is named <addon>_<target>.zip
+# 一次分析，同时为多个目标版本发布插件，例如旧版本的bl_info插件和Blender4.2以上的扩展
+@traced()
+def release_addon_targets(addon_name, targets=None, with_timestamp=False, release_dir=DEFAULT_RELEASE_DIR,
+                          import_graph=None, with_bytecode=None, bundle=None, use_release_cache=None) -> dict:
+    targets = RELEASE_TARGETS if targets is None else targets
+    if is_subdirectory(release_dir, PROJECT_ROOT):
+        raise ValueError("Invalid release dir:", release_dir,
+                         "Please set a release/test dir outside the current workspace")
+    if not bool(addon_namespace_pattern.match(addon_name)):
+        raise ValueError("InValid addon_name:", addon_name, "Please name it as a python package name")
+    for target in targets:
+        if target not in (TARGET_LEGACY, TARGET_EXTENSION):
+            raise ValueError("Unknown release target:", target, "Please use", TARGET_LEGACY, "or", TARGET_EXTENSION)
+
+    with_bytecode = RELEASE_WITH_BYTECODE if with_bytecode is None else with_bytecode
+    bundle = RELEASE_BUNDLE_SHARED_MODULES if bundle is None else bundle
+    use_release_cache = RELEASE_CACHE_ENABLED if use_release_cache is None else use_release_cache
+    if with_bytecode:
+        check_bytecode_target(get_blender_python_version(extract_blender_version(BLENDER_EXE_PATH)))
+    if not os.path.isdir(release_dir):
+        os.mkdir(release_dir)
+
+    target_init_file = get_init_file_path(addon_name)
+    release_files = collect_release_files(target_init_file, addon_name, import_graph)
+    all_py_modules = find_py_modules_from_paths(release_files.keys())
+    plan = plan_release_files(addon_name, release_files, with_bytecode, bundle)
+    add_trace_args(addon=addon_name, files=len(release_files), targets=list(targets))
+
+    transformed = {}
+    compressed_cache = {}
+
+    def get_transformed():
+        if len(transformed) == 0:
+            transformed.update(transform_release_files(plan, all_py_modules))
+        return transformed
+
+    released_paths = {}
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for target in targets:
+        target_name = "{}_{}".format(addon_name, target)
+        target_plan = get_target_plan(plan, target, target_init_file)
+        released_addon_path = os.path.abspath(os.path.join(
+            release_dir, target_name + ("_" + timestamp if with_timestamp else "") + ".zip"))
+        write_release_zip(target_plan, released_addon_path, get_plan_file(release_dir, target_name),
+                          use_release_cache, get_transformed, compressed_cache)
+        released_paths[target] = released_addon_path
+    return released_paths
+
+
+# The legacy addon zip is installed by blender 2.93 - 4.1 from the bl_info of the addon, it does not contain the
+# extension manifest and the wheels. The extension package of blender 4.2+ contains everything.
+def get_target_plan(plan: ReleasePlan, target, target_init_file) -> ReleasePlan:
+    manifest_arcname = plan.addon_name + "/" + ADDON_MANIFEST_FILE
+    if target == TARGET_LEGACY:
+        if not has_bl_info(target_init_file):
+            raise ValueError("Can not release the legacy addon:", target_init_file, "does not define bl_info")
+        entries = [entry for entry in plan.entries
+                   if entry.rewrite != REWRITE_WHEEL and entry.arcname != manifest_arcname]
+    else:
+        if not any(entry.arcname == manifest_arcname for entry in plan.entries):
+            raise ValueError("Can not release the extension:", ADDON_MANIFEST_FILE, "not found next to",
+                             target_init_file)
+        entries = list(plan.entries)
+    target_plan = ReleasePlan(plan.addon_name, dict(plan.options, target=target), plan.source_root)
+    for entry in entries:
+        target_plan.add(entry)
+    return target_plan
+
+
+def has_bl_info(init_file) -> bool:
+    root = ast.parse(read_utf8(init_file), filename=init_file)
+    for node in root.body:
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == "bl_info"
+                                                for target in node.targets):
+            return True
+    return False
+
+
+# Release several addons with a single dependency analysis of the workspace, the addons are packaged concurrently.
+# addon_names: the addons to release, None to release every addon in the addons folder
+# 一次分析整个工作空间的依赖关系，并发打包多个插件
+# import_graph: optional graph containing the dependencies of all the addons, built when None
+@traced()
+def release_addons(addon_names=None, with_timestamp=False, release_dir=DEFAULT_RELEASE_DIR, workers=None,
+                   import_graph=None) -> list:
+    if addon_names is None:
+        addon_names = get_all_addon_names()
+    addon_names = sorted(set(addon_names))
+    init_files = [get_init_file_path(addon_name) for addon_name in addon_names]
+    # check the release dir and the names before creating anything, release_addon checks them again
+    if is_subdirectory(release_dir, PROJECT_ROOT):
+        raise ValueError("Invalid release dir:", release_dir,
+                         "Please set a release/test dir outside the current workspace")
+    for addon_name in addon_names:
+        if not bool(addon_namespace_pattern.match(addon_name)):
+            raise ValueError("InValid addon_name:", addon_name, "Please name it as a python package name")
+    if not os.path.isdir(release_dir):
+        os.mkdir(release_dir)
+
+    if import_graph is None:
+        import_graph = build_import_graph(get_addon_entry_files(addon_names), PROJECT_ROOT)
+
+    workers = workers or min(len(addon_names), os.cpu_count() or 1) or 1
+    # the addons share one process pool for the transforms, started only if an addon has enough files to transform
+    with LazyProcessPool() as transform_pool, concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(release_addon, init_file, addon_name, with_timestamp=with_timestamp,
+                                   release_dir=release_dir, import_graph=import_graph, transform_pool=transform_pool)
+                   for init_file, addon_name in zip(init_files, addon_names)]
+        return [future.result() for future in futures]
+
+
+# Find the addons affected by the changed files, or by the files changed in a git diff range like "origin/main...HEAD".
+# An addon is affected when one of its files, its wheels, or a file imported by the addon directly or indirectly changed.
+# Returns the names of the affected addons and the import graph of all addons, which can be passed to release_addons.
+# A deleted file is not in the import graph anymore, it affects the addons whose previous release in release_dir
+# contains it. Without a previous release, a deleted file outside of the addons folder affects every addon.
+# 找出受修改影响的插件
+@traced()
+def find_affected_addons(changed_files=None, diff_range=None, release_dir=DEFAULT_RELEASE_DIR) -> tuple:
+    if changed_files is None:
+        if diff_range is None:
+            raise ValueError("Please provide the changed files or a git diff range")
+        changed_files = get_git_changed_files(PROJECT_ROOT, diff_range)
+    changed_files = set(os.path.abspath(file_path) for file_path in changed_files)
+    addon_names = get_all_addon_names()
+    import_graph = build_import_graph(get_addon_entry_files(addon_names), PROJECT_ROOT)
+    affected_files = find_affected_files(changed_files, import_graph)
+    deleted_files = set(file_path for file_path in changed_files if not os.path.exists(file_path))
+
+    affected_addons = []
+    for addon_name in addon_names:
+        addon_folder = os.path.join(ADDON_ROOT, addon_name)
+        entry_files = set(get_addon_entry_files([addon_name]))
+        if not entry_files.isdisjoint(affected_files) or not changed_files.isdisjoint(get_addon_wheels(addon_name)) \
+                or any(is_subdirectory(file_path, addon_folder) for file_path in changed_files) \
+                or is_affected_by_deletion(addon_name, deleted_files, release_dir):
+            affected_addons.append(addon_name)
+    add_trace_args(changed=len(changed_files), deleted=len(deleted_files), affected_files=len(affected_files),
+                   affected=len(affected_addons))
+    return affected_addons, import_graph
+
+
+def is_affected_by_deletion(addon_name, deleted_files: set, release_dir) -> bool:
+    if len(deleted_files) == 0:
+        return False
+    released_sources = get_released_sources(addon_name, release_dir)
+    if released_sources is None:
+        return any(not is_subdirectory(file_path, ADDON_ROOT) for file_path in deleted_files)
+    return not deleted_files.isdisjoint(released_sources)
+
+
+# Returns the source files of the previous releases of the addon in release_dir, None if there is no previous release
+def get_released_sources(addon_name, release_dir):
+    released_sources = None
+    plan_names = [addon_name] + ["{}_{}".format(addon_name, target) for target in (TARGET_LEGACY, TARGET_EXTENSION)]
+    for plan_name in plan_names:
+        plan = load_plan(get_plan_file(release_dir, plan_name))
+        if plan is None:
+            continue
+        released_sources = released_sources or set()
+        released_sources.update(os.path.abspath(os.path.join(PROJECT_ROOT, entry["source"]))
+                                for entry in plan["entries"].values())
+    return released_sources
+
+
+# Release only the addons affected by the changed files or the git diff range, returns the released zip files
+def release_affected_addons(changed_files=None, diff_range=None, with_timestamp=False,
+                            release_dir=DEFAULT_RELEASE_DIR) -> list:
+    affected_addons, import_graph = find_affected_addons(changed_files, diff_range, release_dir)
+    print("Affected addons:", ", ".join(affected_addons) if affected_addons else "none")
+    if len(affected_addons) == 0:
+        return []
+    return release_addons(affected_addons, with_timestamp=with_timestamp, release_dir=release_dir,
+                          import_graph=import_graph)
+
+
+# Returns the names of all addons in the addons folder
+def get_all_addon_names() -> list:
+    return sorted(name for name in os.listdir(ADDON_ROOT)
+                  if os.path.isfile(os.path.join(ADDON_ROOT, name, "__init__.py"))
+                  and bool(addon_namespace_pattern.match(name)))
+
+
+# The files every release of the addons starts the dependency search from
+def get_addon_entry_files(addon_names) -> list:
+    entry_files = [os.path.abspath(os.path.join(ADDON_ROOT, "__init__.py"))]
+    for addon_name in addon_names:
+        entry_files.extend(os.path.abspath(py_file)
+                           for py_file in search_files(os.path.join(ADDON_ROOT, addon_name), {".py"}))
+    return entry_files
+
+
+# Compute the entries of the released zip without writing anything.
+# The shared modules are bundled when bundle is True, the wheels are added to the wheel store.
+@traced()
+def plan_release_files(addon_name, release_files: dict, with_bytecode=False, bundle=False) -> ReleasePlan:
+    options = {"bytecode": sys.implementation.cache_tag if with_bytecode else None, "bundle": bundle,
+               "date_time": list(default_date_time()), "transforms": list(RELEASE_SOURCE_TRANSFORMS)}
+    plan = ReleasePlan(addon_name, options, PROJECT_ROOT)
+    for rel_path, file in sorted(release_files.items()):
+        size, sha256 = hash_file(file)
+        if not rel_path.endswith(".py"):
+            rewrite = REWRITE_NONE
+        elif bundle and get_bundle_package(rel_path, {_ADDONS_FOLDER}) is not None:
+            rewrite = REWRITE_BUNDLE
+        else:
+            rewrite = REWRITE_IMPORTS
+        plan.add(PlanEntry(os.path.join(addon_name, rel_path), file, rewrite, size, sha256,
+                           compiled=with_bytecode and rewrite != REWRITE_NONE))
+    # planning does not write anything, the wheels are only hashed here and stored when the zip is written
+    for wheel_source in get_addon_wheels(addon_name):
+        wheel = get_wheel_store().hash(wheel_source)
+        plan.add(PlanEntry(os.path.join(addon_name, WHEELS_PATH, wheel.name), wheel_source, REWRITE_WHEEL, wheel.size,
+                           wheel.sha256))
+    add_trace_args(entries=len(plan.entries))
+    return plan
+
+
+# Plan the release of the addon, the plan is compared with the plan of the previous release in release_dir
+def plan_release(addon_name, release_dir=DEFAULT_RELEASE_DIR, with_bytecode=None, bundle=None,
+                 print_plan=True) -> ReleasePlan:
+    with_bytecode = RELEASE_WITH_BYTECODE if with_bytecode is None else with_bytecode
+    bundle = RELEASE_BUNDLE_SHARED_MODULES if bundle is None else bundle
+    # a dry run does not write anything, the import cache is only updated in memory
+    import_graph = build_import_graph(get_addon_entry_files([addon_name]), PROJECT_ROOT, save_cache=False)
+    target_init_file = get_init_file_path(addon_name)
+    release_files = collect_release_files(target_init_file, addon_name, import_graph)
+    plan = plan_release_files(addon_name, release_files, with_bytecode, bundle)
+    if print_plan:
+        print(format_plan(plan))
+        # the release of the addon and the releases of each target are compared with their own previous plan
+        found_previous = False
+        for target in [None, TARGET_LEGACY, TARGET_EXTENSION]:
+            plan_name = addon_name if target is None else "{}_{}".format(addon_name, target)
+            previous_plan = load_plan(get_plan_file(release_dir, plan_name))
+            if previous_plan is None:
+                continue
+            found_previous = True
+            try:
+                new_plan = (plan if target is None else get_target_plan(plan, target, target_init_file)).to_dict()
+            except ValueError as e:
+                print("Changes of", plan_name, "can not be planned:", e)
+                continue
+            print("Changes of", plan_name, "since the previous release:")
+            print(format_diff(diff_plans(previous_plan, new_plan), previous_plan, new_plan))
+        if not found_previous:
+            print("No previous release of", addon_name, "found in", release_dir)
+    return plan
+
+
+# The cache key covers the plan and the code producing the released content, so changing the tools invalidates it
+def get_release_cache_key(plan: ReleasePlan) -> str:
+    tool_modules = [bundler, bytecode, import_rewriter, source_transforms, zip_writer]
+    tool_files = [os.path.abspath(__file__)] + [module.__file__ for module in tool_modules]
+    return compute_cache_key(plan.to_dict(), tool_files)
+
+
+# Run the transform chain on the released python files, returns a dict of archive path -> transformed content.
+# The results are cached by content, the files that are not cached are transformed in a process pool when there are
+# at least PARALLEL_PARSE_MIN_FILES of them.
+# pool: the LazyProcessPool to use, a pool is created for this call when None
+@traced()
+def transform_release_files(plan: ReleasePlan, all_py_modules: set, pool=None) -> dict:
+    if "rewrite_imports" not in RELEASE_SOURCE_TRANSFORMS:
+        raise ValueError("Invalid RELEASE_SOURCE_TRANSFORMS:", RELEASE_SOURCE_TRANSFORMS,
+                         "rewrite_imports is required to import the modules from the addon namespace")
+    chain = create_transform_chain(RELEASE_SOURCE_TRANSFORMS)
+    chain_key = chain.get_key(plan.addon_name, all_py_modules)
+    cache = TransformCache(TRANSFORM_CACHE_DIR, max_age=TRANSFORM_CACHE_MAX_AGE_DAYS * 24 * 3600,
+                           max_size=TRANSFORM_CACHE_MAX_SIZE)
+    transformed = {}
+    to_transform = []
+    for entry in plan.entries:
+        if entry.rewrite not in (REWRITE_IMPORTS, REWRITE_BUNDLE):
+            continue
+        content = cache.get(cache.get_key(entry.sha256, chain_key))
+        if content is None:
+            to_transform.append(entry)
+        else:
+            transformed[entry.arcname] = content
+
+    contexts = [TransformContext(os.path.relpath(entry.arcname, plan.addon_name), plan.addon_name, all_py_modules)
+                for entry in to_transform]
+    source_paths = [entry.source_path for entry in to_transform]
+    if len(to_transform) >= PARALLEL_PARSE_MIN_FILES:
+        chunk_size = max(1, len(to_transform) // (4 * get_dependency_parse_workers()))
+        if pool is not None:
+            results = list(pool.get().map(read_and_transform, source_paths, [chain] * len(to_transform), contexts,
+                                          chunksize=chunk_size))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=get_dependency_parse_workers()) as executor:
+                results = list(executor.map(read_and_transform, source_paths, [chain] * len(to_transform),
+                                            contexts, chunksize=chunk_size))
+    else:
+        results = list(map(read_and_transform, source_paths, [chain] * len(to_transform), contexts))
+    for entry, (content_sha256, content) in zip(to_transform, results):
+        # keyed by the content that was actually transformed, in case the file changed after planning
+        cache.put(cache.get_key(content_sha256, chain_key), content)
+        transformed[entry.arcname] = content
+    if len(to_transform) > 0:
+        cache.evict()
+    add_trace_args(files=len(transformed), transformed=len(to_transform))
+    return transformed
+
+
+# transformed: the transformed content of the python files, as returned by transform_release_files
+@traced()
+def create_zip_entries(plan: ReleasePlan, transformed: dict) -> list:
+    zip_entries = []
+    with_bytecode = plan.options["bytecode"] is not None
+    bundled_sources = {}
+    for entry in plan.entries:
+        rel_path = os.path.relpath(entry.arcname, plan.addon_name)
+        if entry.rewrite == REWRITE_BUNDLE:
+            package = get_bundle_package(rel_path, {_ADDONS_FOLDER})
+            bundled_sources.setdefault(package, {})[rel_path] = transformed[entry.arcname].decode("utf-8")
+        elif entry.rewrite == REWRITE_WHEEL:
+            # wheels are streamed from the wheel store without compression
+            wheel = get_wheel_store().add(entry.source_path)
+            zip_entries.append(ZipEntry(entry.arcname, source_path=wheel.path, compress=False, crc32=wheel.crc32))
+        elif entry.rewrite == REWRITE_IMPORTS:
+            content = transformed[entry.arcname]
+            zip_entries.append(ZipEntry(entry.arcname, data=content))
+            if entry.compiled:
+                zip_entries.append(ZipEntry(get_bytecode_path(entry.arcname), data=content,
+                                            transform=functools.partial(compile_bytecode,
+                                                                        filename=rel_path.replace(os.sep, "/"))))
+        else:
+            compress = os.path.splitext(entry.arcname)[1].lower() not in RELEASE_STORED_EXTENSIONS
+            zip_entries.append(ZipEntry(entry.arcname, source_path=entry.source_path, compress=compress))
+    for package, sources in sorted(bundled_sources.items()):
+        zip_entries.extend(create_bundle_entries(plan.addon_name, package, sources, with_bytecode))
+    return zip_entries
+
+
+# sources: path relative to the release root -> transformed source of the bundled modules
+def create_bundle_entries(addon_name, package, sources: dict, with_bytecode) -> list:
+    bundle_path = os.path.join(package, "__init__.py")
+    # the bundled modules are precompiled as well, they are not compiled again every time the addon is enabled
+    bundle_source = build_bundle_source(sources, compile_bytecode if with_bytecode else None).encode("utf-8")
+    entries = [ZipEntry(os.path.join(addon_name, bundle_path), data=bundle_source)]
+    if with_bytecode:
+        entries.append(ZipEntry(get_bytecode_path(os.path.join(addon_name, bundle_path)),
+                                data=compile_bytecode(bundle_source, bundle_path.replace(os.sep, "/"))))
+    add_trace_args(bundled_files=len(sources))
+    return entries
+
+
+# Returns the wheel files listed in the blender_manifest.toml of the addon
+def get_addon_wheels(addon_name) -> list:
+    addon_config_file = os.path.join(ADDON_ROOT, addon_name, ADDON_MANIFEST_FILE)
+    if not os.path.exists(addon_config_file):
+        return []
+    addon_config = read_addon_manifest(addon_config_file)
+    wheel_sources = []
+    for wheel_file in addon_config.get("wheels", []):
+        wheel_source = os.path.join(PROJECT_ROOT, wheel_file)
+        if not os.path.exists(wheel_source):
+            raise ValueError("Wheel file not found:", wheel_source,
+                             ". Please download the required wheel file to the wheels folder.")
+        wheel_sources.append(os.path.abspath(wheel_source))
+    return wheel_sources
+
+
+def read_addon_manifest(addon_config_file) -> dict:
+    content = read_utf8(addon_config_file)
+    try:
+        return tomllib.loads(content)
+    except NameError:
+        return toml.loads(content)
+
+
+# Find all files to be released, returns a dict of path relative to the release folder -> absolute source path
+@traced()
+def collect_release_files(target_init_file, addon_name, import_graph=None) -> dict:
+    release_filter = get_release_filter(addon_name)
+    release_files = {"__init__.py": os.path.abspath(target_init_file)}
     # 将target_init_file同级的其他非py文件复制到发布目录 如 toml xml等可能跟插件有关的配置文件
     for file in os.listdir(os.path.dirname(target_init_file)):
         file_path = os.path.join(os.path.dirname(target_init_file), file)
-        if os.path.isdir(file_path) or file.endswith(".py"):
+        if os.path.isdir(file_path) or file.endswith(".py") or release_filter.is_ignored(file_path):
             continue
-        shutil.copy(file_path, release_folder)
+        release_files[file] = os.path.abspath(file_path)
 
     # 将插件文件夹复制到发布目录
-    shutil.copytree(os.path.join(ADDON_ROOT, addon_name), os.path.join(release_folder, _ADDONS_FOLDER, addon_name))
-    shutil.copyfile(os.path.join(ADDON_ROOT, "__init__.py"),
-                    os.path.join(release_folder, _ADDONS_FOLDER, "__init__.py"))
-
-    all_py_files = search_files(os.path.join(ADDON_ROOT, addon_name), {".py"})
+    addon_folder = os.path.join(ADDON_ROOT, addon_name)
+    ignored_files = 0
+    for file in search_files(addon_folder, set()):
+        # pyc files are auto generated, they are not released
+        if file.endswith(".pyc"):
+            continue
+        if release_filter.is_ignored(file):
+            ignored_files += 1
+            continue
+        release_files[os.path.join(_ADDONS_FOLDER, addon_name, os.path.relpath(file, addon_folder))] = \
+            os.path.abspath(file)
+    addons_init_file = os.path.abspath(os.path.join(ADDON_ROOT, "__init__.py"))
+    release_files[os.path.join(_ADDONS_FOLDER, "__init__.py")] = addons_init_file
+    add_trace_args(ignored=ignored_files)
+
+    # ignored python files are still released when they are imported by the released files
+    all_py_files = [py_file for py_file in search_files(addon_folder, {".py"})
+                    if not release_filter.is_ignored(py_file)]
     # 对插件文件夹中的每一个py文件进行分析，找到每个py文件中依赖的其他py文件
     visited_py_files = set()
     for py_file in all_py_files:
         visited_py_files.add(os.path.abspath(py_file))
     # 注意不要漏掉__init__.py文件
-    visited_py_files.add(os.path.abspath(os.path.join(ADDON_ROOT, "__init__.py")))
+    visited_py_files.add(addons_init_file)
 
-    dependencies = find_all_dependencies(list(visited_py_files), PROJECT_ROOT)
+    if import_graph is not None:
+        dependencies = find_dependencies_in_graph(list(visited_py_files), import_graph)
+    else:
+        dependencies = find_all_dependencies(list(visited_py_files), PROJECT_ROOT)
     for dependency in dependencies:
         dependency = os.path.abspath(dependency)
         if dependency in visited_py_files:
             continue
         visited_py_files.add(dependency)
-        target_path = os.path.join(release_folder, os.path.relpath(dependency, PROJECT_ROOT))
-        if not os.path.exists(os.path.dirname(target_path)):
-            os.makedirs(os.path.dirname(target_path))
-        shutil.copy(dependency, os.path.join(release_folder, os.path.relpath(dependency, PROJECT_ROOT)))
+        release_files[os.path.relpath(dependency, PROJECT_ROOT)] = dependency
+    return release_files
 
-    remove_pyc_files(release_folder)
-    removed_path = 1
-    while removed_path > 0:
-        removed_path = remove_empty_folders(release_folder)
 
-    enhance_import_for_py_files(release_folder)
+def get_release_filter(addon_name) -> ReleaseFilter:
+    release_filter = ReleaseFilter()
+    release_filter.add(PROJECT_ROOT, load_ignore_rules(os.path.join(PROJECT_ROOT, RELEASE_IGNORE_FILE),
+                                                       RELEASE_IGNORE_PATTERNS))
+    addon_folder = os.path.join(ADDON_ROOT, addon_name)
+    release_filter.add(addon_folder, load_ignore_rules(os.path.join(addon_folder, RELEASE_IGNORE_FILE)))
+    return release_filter
 
-    # include wheel files when need to be zipped
-    if need_zip:
-        addon_config_file = os.path.join(ADDON_ROOT, addon_name, ADDON_MANIFEST_FILE)
-        if os.path.exists(addon_config_file):
-            with open(addon_config_file, 'r', encoding='utf-8') as f:
-                try:
-                    addon_config = tomllib.loads(f.read())
-                except Exception as e:
-                    addon_config = toml.load(f)
-                if "wheels" in addon_config:
-                    wheel_files = addon_config["wheels"]
-                    if len(wheel_files) > 0:
-                        wheel_folder = os.path.join(release_folder, WHEELS_PATH)
-                        os.mkdir(wheel_folder)
-                        for wheel_file in wheel_files:
-                            wheel_source = os.path.join(PROJECT_ROOT, wheel_file)
-                            if not os.path.exists(wheel_source):
-                                raise ValueError("Wheel file not found:", wheel_source,
-                                                 ". Please download the required wheel file to the wheels folder.")
-                            shutil.copy(wheel_source, wheel_folder)
 
-    real_addon_name = ("{addon_name}_{timestamp}"
-                       .format(addon_name=release_folder,
-                               timestamp=datetime.now().strftime(
-                                   "%Y%m%d_%H%M%S"))) if with_timestamp else ("{addon_name}"
-                                                                              .format(addon_name=release_folder))
+_import_cache = None
 
-    released_addon_path = os.path.abspath(os.path.join(release_dir, real_addon_name) + ".zip")
-    # zip the addon
-    if need_zip:
-        zip_folder(release_folder, real_addon_name)
-        print("Add on released:", released_addon_path)
 
-    return released_addon_path
+# shared by all addons of a batch release, e.g. identical wheels are only hashed and stored once
+_wheel_store = None
+_release_cache = None
+_reload_latency = None
+_folder_signatures = {}
+_caches_lock = threading.Lock()
+
+
+def get_wheel_store() -> WheelStore:
+    global _wheel_store
+    with _caches_lock:
+        if _wheel_store is None:
+            _wheel_store = WheelStore(WHEEL_STORE_DIR)
+        return _wheel_store
+
+
+def get_folder_signature(folder) -> FolderSignature:
+    folder = os.path.abspath(folder)
+    with _caches_lock:
+        if folder not in _folder_signatures:
+            _folder_signatures[folder] = FolderSignature(folder)
+        return _folder_signatures[folder]
+
 
+def get_reload_latency() -> ReloadLatency:
+    global _reload_latency
+    with _caches_lock:
+        if _reload_latency is None:
+            _reload_latency = ReloadLatency(RELOAD_LATENCY_SAMPLES)
+        return _reload_latency
 
-# pyc files are auto generated, need to be removed before release
-def remove_pyc_files(release_folder: str):
-    all_pyc_file = search_files(release_folder, {"pyc"})
-    for pyc_file in all_pyc_file:
-        os.remove(pyc_file)
 
+def get_release_cache() -> ArtifactCache:
+    global _release_cache
+    with _caches_lock:
+        if _release_cache is None:
+            _release_cache = ArtifactCache(RELEASE_CACHE_DIR, max_age=RELEASE_CACHE_MAX_AGE_DAYS * 24 * 3600,
+                                           max_size=RELEASE_CACHE_MAX_SIZE)
+        return _release_cache
 
-def remove_empty_folders(root_path):
-    all_folder_to_remove = []
-    for root, dirnames, filenames in os.walk(root_path, topdown=False):
-        for dirname in dirnames:
-            dir_to_check = os.path.join(root, dirname)
-            if not os.listdir(dir_to_check):
-                all_folder_to_remove.append(dir_to_check)
-    for folder in all_folder_to_remove:
-        shutil.rmtree(folder)
-    return len(all_folder_to_remove)
 
+def get_import_cache() -> ImportCache:
+    global _import_cache
+    with _caches_lock:
+        if _import_cache is None:
+            _import_cache = ImportCache(IMPORT_CACHE_FILE)
+        return _import_cache
 
-# Zip the folder in a way that blender can recognize it as an addon.
-def zip_folder(target_root, output_zip_file):
-    shutil.make_archive(output_zip_file, 'zip', Path(target_root).parent, base_dir=os.path.basename(target_root))
 
+# one index per workspace root, kept up to date by the file watcher in watch mode
+_module_indexes = {}
+_module_indexes_lock = threading.Lock()
 
-def find_imported_modules(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        root = ast.parse(file.read(), filename=file_path)
 
-    imported_modules = set()
-    for node in ast.walk(root):
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                imported_modules.add(alias.name)
-        elif isinstance(node, ast.ImportFrom):
-            if node.module:
-                module_name = node.module
-                imported_modules.add(module_name)
-            for alias in node.names:
-                if node.module:
-                    imported_modules.add(f"{node.module}.{alias.name}")
-                else:
-                    imported_modules.add(alias.name)
+def get_module_index(project_root) -> ModuleIndex:
+    project_root = os.path.abspath(project_root)
+    with _module_indexes_lock:
+        if project_root not in _module_indexes:
+            _module_indexes[project_root] = ModuleIndex(project_root)
+        return _module_indexes[project_root]
 
-    return imported_modules
+
+# Update the module indexes after a file or folder was created, deleted or moved
+def update_module_indexes(path):
+    with _module_indexes_lock:
+        module_indexes = list(_module_indexes.values())
+    for module_index in module_indexes:
+        module_index.update(path)
 
 
 def resolve_module_path(module_name, base_path, project_root):
+    module_index = get_module_index(project_root)
     if not module_name.endswith(".*"):
         # Handle import all
         module_path = module_name.replace('.', '/')
         module_path = os.path.join(project_root, module_path)
-        if os.path.isdir(module_path):
+        if module_index.isdir(module_path):
             module_path = os.path.join(module_path, '__init__.py')
             return [module_path]
-        elif os.path.isfile(module_path + '.py'):
+        elif module_index.isfile(module_path + '.py'):
             module_path = module_path + '.py'
             return [module_path]
         else:
@@ -353,10 +1115,10 @@ def resolve_module_path(module_name, base_path, project_root):
             while is_subdirectory(current_search_dir, project_root):
                 module_path = module_name.replace('.', '/')
                 module_path = os.path.join(current_search_dir, module_path)
-                if os.path.isdir(module_path):
+                if module_index.isdir(module_path):
                     module_path = os.path.join(module_path, '__init__.py')
                     return [module_path]
-                elif os.path.isfile(module_path + '.py'):
+                elif module_index.isfile(module_path + '.py'):
                     module_path = module_path + '.py'
                     return [module_path]
                 current_search_dir = os.path.dirname(current_search_dir)
@@ -365,10 +1127,10 @@ def resolve_module_path(module_name, base_path, project_root):
         module_name = module_name[:-2]
         module_path = module_name.replace('.', '/')
         possible_root_path = os.path.join(project_root, module_path)
-        if os.path.isdir(possible_root_path):
+        if module_index.isdir(possible_root_path):
             possible_root_path = os.path.join(possible_root_path, '__init__.py')
             return [possible_root_path]
-        elif os.path.isfile(possible_root_path + '.py'):
+        elif module_index.isfile(possible_root_path + '.py'):
             possible_root_path = possible_root_path + '.py'
             return [possible_root_path]
         else:
@@ -376,69 +1138,155 @@ def resolve_module_path(module_name, base_path, project_root):
             while is_subdirectory(current_search_dir, project_root):
 
                 possible_root_path = os.path.join(current_search_dir, module_path)
-                if os.path.isdir(possible_root_path):
+                if module_index.isdir(possible_root_path):
                     possible_root_path = os.path.join(possible_root_path, '__init__.py')
                     return [possible_root_path]
-                elif os.path.isfile(possible_root_path + '.py'):
+                elif module_index.isfile(possible_root_path + '.py'):
                     possible_root_path = possible_root_path + '.py'
                     return [possible_root_path]
                 current_search_dir = os.path.dirname(current_search_dir)
             return []
 
 
-def find_all_dependencies(file_paths: list, project_root: str):
-    dependencies = set()
-    to_process = file_paths.copy()
-    processed = set()
+# Search the dependencies wave by wave: all files found in the same wave are parsed together, in parallel when the
+# wave is large enough, and the result does not depend on the order the files are parsed.
+# parallel: None to decide automatically, False to always parse in the current process
+@traced()
+def find_all_dependencies(file_paths: list, project_root: str, use_cache=True, parallel=None):
+    return set(build_import_graph(file_paths, project_root, use_cache=use_cache, parallel=parallel).keys())
+
+
+# Returns a dict of file -> set of the workspace files it imports, for the given files and all their dependencies
+# save_cache: write the updated import cache to disk, False to keep the analysis free of writes, e.g. in a dry run
+@traced()
+def build_import_graph(file_paths: list, project_root: str, use_cache=True, parallel=None, save_cache=True) -> dict:
+    import_cache = get_import_cache() if use_cache else None
+    import_graph = {}
+    to_process = sorted(set(os.path.abspath(file_path) for file_path in file_paths))
+    # the pool starts only when a wave has enough files missing from the cache
+    pool = LazyProcessPool() if parallel is not False else None
+
+    try:
+        while to_process:
+            imported_modules_of_files = find_imported_modules_of_files(to_process, import_cache, pool)
+
+            next_to_process = set()
+            for current_file in to_process:
+                imported_files = set()
+                for module in sorted(imported_modules_of_files[current_file]):
+                    for each_module_path in resolve_module_path(module, current_file, project_root):
+                        imported_files.add(os.path.abspath(each_module_path))
+                import_graph[current_file] = imported_files
+                next_to_process.update(imported_files)
+            to_process = sorted(file_path for file_path in next_to_process if file_path not in import_graph)
+        parallel = pool is not None and pool.is_started()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if import_cache is not None and save_cache:
+            import_cache.save()
+
+    add_trace_args(files=len(import_graph), parallel=parallel)
+    return import_graph
 
+
+# Find the dependencies of the given files from an import graph built by build_import_graph
+def find_dependencies_in_graph(file_paths: list, import_graph: dict) -> set:
+    dependencies = set()
+    to_process = [os.path.abspath(file_path) for file_path in file_paths]
     while to_process:
-        current_file = os.path.abspath(to_process.pop())
-        if current_file in processed:
+        current_file = to_process.pop()
+        if current_file in dependencies:
             continue
-
-        processed.add(current_file)
+        if current_file not in import_graph:
+            raise ValueError("File not found in the import graph: " + current_file)
         dependencies.add(current_file)
+        to_process.extend(import_graph[current_file] - dependencies)
+    return dependencies
 
-        try:
-            imported_modules = find_imported_modules(current_file)
-        except SyntaxError as e:
-            raise SyntaxError(f"Syntax error in file {current_file}: {e}")
-
-        # potential_init_file = os.path.abspath(os.path.join(os.path.dirname(current_file), '__init__.py'))
-        # if os.path.exists(potential_init_file) and potential_init_file not in processed:
-        #     to_process.append(potential_init_file)
-        #     dependencies.add(potential_init_file)
-
-        for module in imported_modules:
-            module_path = resolve_module_path(module, current_file, project_root)
-            if len(module_path) > 0:
-                for each_module_path in module_path:
-                    each_module_path = os.path.abspath(each_module_path)
-                    if each_module_path not in processed:
-                        to_process.append(each_module_path)
 
-    return dependencies
+def get_dependency_parse_workers() -> int:
+    return DEPENDENCY_PARSE_WORKERS or os.cpu_count() or 1
 
 
-def enhance_import_for_py_files(addon_dir: str):
-    namespace = os.path.basename(addon_dir)
-    all_py_modules = find_all_py_modules(addon_dir)
-    all_py_file = search_files(addon_dir, {".py"})
-    for py_file in all_py_file:
-        content = read_utf8(py_file)
-        for module_path in import_module_pattern.finditer(content):
-            original_module_path = module_path.groups()[0]
-            if original_module_path in all_py_modules:
-                content = content.replace("from " + original_module_path + " import",
-                                          "from " + namespace + "." + original_module_path + " import")
-        write_utf8(py_file, content)
+# A process pool started on the first call of get, so no worker process is started when there are too few files to
+# process in parallel. The workers import main.py again on the platforms starting the processes with spawn.
+# 首次使用时才创建的进程池，文件较少时不会启动任何子进程
+class LazyProcessPool:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or get_dependency_parse_workers()
+        self.executor = None
+        self._lock = threading.Lock()
 
+    def get(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers)
+            return self.executor
 
-def find_all_py_modules(root_dir: str) -> set:
+    def shutdown(self):
+        with self._lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+    def is_started(self) -> bool:
+        return self.executor is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+
+@traced()
+def find_imported_modules_of_files(file_paths: list, import_cache, pool=None) -> dict:
+    result = {}
+    to_parse = []
+    for file_path in file_paths:
+        imported_modules = import_cache.get_cached_modules(file_path) if import_cache is not None else None
+        if imported_modules is None:
+            to_parse.append(file_path)
+        else:
+            result[file_path] = imported_modules
+
+    try:
+        if pool is not None and len(to_parse) >= PARALLEL_PARSE_MIN_FILES:
+            chunk_size = max(1, len(to_parse) // (4 * get_dependency_parse_workers()))
+            parsed_files = pool.get().map(read_and_parse_imports, to_parse, chunksize=chunk_size)
+        else:
+            parsed_files = map(read_and_parse_imports, to_parse)
+        for file_path, parsed in zip(to_parse, parsed_files):
+            result[file_path] = set(parsed[-1])
+            if import_cache is not None:
+                import_cache.store(*parsed)
+    except SyntaxError as e:
+        raise SyntaxError(f"Syntax error in file {e.filename}: {e}")
+    add_trace_args(files=len(file_paths), parsed=len(to_parse))
+    return result
+
+
+# Rewrite the imports of workspace modules to import them from the addon namespace
+def enhance_import_for_content(content: str, namespace: str, all_py_modules: set) -> str:
+    return rewrite_imports(content, namespace, all_py_modules)
+
+
+# Transform used when syncing the release files, only python files are rewritten
+def enhance_import_for_file_content(rel_path: str, content: bytes, namespace: str, all_py_modules: set):
+    if not rel_path.endswith(".py"):
+        return None
+    text = content.decode("utf-8")
+    return enhance_import_for_content(text, namespace, all_py_modules).encode("utf-8")
+
+
+# rel_paths: paths relative to the root of the modules
+def find_py_modules_from_paths(rel_paths) -> set:
     all_py_modules = set()
-    all_py_file = search_files(root_dir, {".py"})
-    for py_file in all_py_file:
-        rel_path = str(os.path.relpath(py_file, root_dir))
+    for rel_path in rel_paths:
+        rel_path = str(rel_path).replace("/", os.path.sep)
+        if not rel_path.endswith(".py"):
+            continue
         modules = rel_path.replace("__init__.py", "").replace(".py", "").split(os.path.sep)
         if len(modules[-1]) == 0:
             modules = modules[0:-1]
@@ -451,55 +1299,253 @@ def find_all_py_modules(root_dir: str) -> set:
 
 
 class FileUpdateHandler(FileSystemEventHandler):
-    def __init__(self):
+    # watch_scope: only the changes in the scope trigger an update, None to update on any python file change
+    # release_filter: the files of the addon folder ignored by the release do not trigger an update
+    def __init__(self, watch_scope=None, release_filter=None):
         super(FileUpdateHandler, self).__init__()
         self.has_update = False
+        self.watch_scope = watch_scope
+        self.release_filter = release_filter
+        self.first_update_time = 0
+        # the wall clock time of the first change, shared with the reload agent to measure the latency
+        self.first_update_wall_time = 0
+        self.last_update_time = 0
+        self.update_event = threading.Event()
+        self._lock = threading.Lock()
 
     def on_any_event(self, event):
-        source_path = event.src_path
-        if source_path.endswith(".py"):
+        # opened and closed events are also sent when the release reads the files
+        if event.event_type not in ("created", "deleted", "modified", "moved"):
+            return
+        paths = [event.src_path]
+        if event.event_type == "moved":
+            paths.append(event.dest_path)
+        if event.event_type in ("created", "deleted", "moved"):
+            for path in paths:
+                update_module_indexes(path)
+        # the files in a created folder send their own events, a moved folder does not
+        if event.is_directory and event.event_type != "moved":
+            return
+        if any(self.is_update(path, event.event_type) for path in paths):
+            self.mark_update()
+
+    def is_update(self, path, event_type) -> bool:
+        if self.watch_scope is None:
+            return path.endswith(".py")
+        path = os.path.abspath(path)
+        if path in self.watch_scope.files:
+            return True
+        if not self.watch_scope.contains(path):
+            # a new module on the import paths may be imported by the next build
+            return event_type != "modified" and path.endswith(".py")
+        return path.endswith(".py") or self.release_filter is None or not self.release_filter.is_ignored(path)
+
+    def mark_update(self):
+        with self._lock:
+            now = time.monotonic()
+            if not self.has_update:
+                self.first_update_time = now
+                self.first_update_wall_time = time.time()
             self.has_update = True
+            self.last_update_time = now
+        self.update_event.set()
 
-    def clear_update(self):
-        self.has_update = False
-
-
-def start_watch_for_update(init_file, addon_name, stop_event: threading.Event):
-    path = PROJECT_ROOT
-    event_handler = FileUpdateHandler()
+    # Wait until no change happened for debounce seconds, or max_delay seconds passed since the first change.
+    # The update is cleared before returning True, changes made during the rebuild trigger another one.
+    # Returns False when stop_event is set.
+    def wait_for_update(self, stop_event: threading.Event, debounce: float, max_delay: float) -> bool:
+        while not stop_event.is_set():
+            if not self.update_event.wait(0.5):
+                continue
+            with self._lock:
+                now = time.monotonic()
+                ready_time = min(self.last_update_time + debounce, self.first_update_time + max_delay)
+                if now >= ready_time:
+                    self.has_update = False
+                    self.update_event.clear()
+                    return True
+            stop_event.wait(ready_time - now)
+        return False
+
+
+# The addon folder and every file the addon imports, they are the only files that change the test build
+def get_watch_scope(addon_name, import_graph: dict) -> WatchScope:
+    files = set(import_graph.keys())
+    files.add(os.path.join(PROJECT_ROOT, RELEASE_IGNORE_FILE))
+    return WatchScope(PROJECT_ROOT, [os.path.join(ADDON_ROOT, addon_name)], files)
+
+
+# Schedule the folders of the watch scope with the observer, watches: dict of (folder, recursive) -> scheduled watch
+def schedule_watch_scope(observer, event_handler: FileUpdateHandler, watch_scope: WatchScope, watches: dict):
+    watched_folders = watch_scope.get_watched_folders()
+    for key in list(watches.keys()):
+        if watched_folders.get(key[0]) != key[1]:
+            observer.unschedule(watches.pop(key))
+    for folder, recursive in watched_folders.items():
+        if (folder, recursive) not in watches and os.path.isdir(folder):
+            watches[(folder, recursive)] = observer.schedule(event_handler, folder, recursive=recursive)
+    # the module index is only updated by the events of the watched folders
+    get_module_index(PROJECT_ROOT).set_watched_folders(watched_folders)
+    event_handler.watch_scope = watch_scope
+
+
+# reload_port: the port of the reload agent in blender, None to only deploy the updates
+def start_watch_for_update(init_file, addon_name, stop_event: threading.Event, reload_port=None):
+    event_handler = FileUpdateHandler(release_filter=get_release_filter(addon_name))
     observer = Observer()
-    observer.schedule(event_handler, path, recursive=True)
+    watches = {}
+    import_graph = build_import_graph(get_addon_entry_files([addon_name]), PROJECT_ROOT)
+    schedule_watch_scope(observer, event_handler, get_watch_scope(addon_name, import_graph), watches)
     observer.start()
-
+    # the wall clock time of the first change not deployed yet, a cancelled build leaves it to the next build
+    undelivered_lock = threading.Lock()
+    undelivered_since = None
+
+    def run_build(build_task):
+        nonlocal undelivered_since
+        with undelivered_lock:
+            event_time = undelivered_since
+            undelivered_since = None
+        try:
+            reload_id = get_reload_latency().start(event_time)
+            new_import_graph = update_addon_for_test(init_file, addon_name, reload_port, reload_id, build_task)
+        except Exception:
+            with undelivered_lock:
+                if undelivered_since is None or (event_time is not None and event_time < undelivered_since):
+                    undelivered_since = event_time
+            raise
+        # the imports may have changed, follow the new dependencies of the addon
+        event_handler.release_filter = get_release_filter(addon_name)
+        schedule_watch_scope(observer, event_handler, get_watch_scope(addon_name, new_import_graph), watches)
+
+    def retry_build():
+        if build_queue.is_idle():
+            event_handler.mark_update()
+
+    def on_build_error(build_task, error):
+        print(error)
+        print(
+            "Addon updated failed: Please make sure no other process is"
+            " using the addon folder. You might need to restart the test to update the addon in Blender.")
+        # try again later, unless a newer change already queued a build
+        timer = threading.Timer(1, retry_build)
+        timer.daemon = True
+        timer.start()
+
+    # one build at a time, a new change cancels the stale build instead of waiting for it
+    build_queue = BuildQueue(run_build, on_build_error)
+    build_queue.start()
     try:
-        while not stop_event.is_set():
-            time.sleep(1)
-            if event_handler.has_update:
-                try:
-                    update_addon_for_test(init_file, addon_name)
-                    event_handler.clear_update()
-                except Exception as e:
-                    print(e)
-                    print(
-                        "Addon updated failed: Please make sure no other process is"
-                        " using the addon folder. You might need to restart the test to update the addon in Blender.")
+        while event_handler.wait_for_update(stop_event, WATCH_DEBOUNCE_SECONDS, WATCH_MAX_DELAY_SECONDS):
+            with undelivered_lock:
+                if undelivered_since is None:
+                    undelivered_since = event_handler.first_update_wall_time
+            build_queue.submit()
         print("Stop watching for update...")
-
     except KeyboardInterrupt:
+        pass
+    finally:
+        build_queue.stop()
         observer.stop()
         observer.join()
 
 
-def update_addon_for_test(init_file, addon_name):
-    addon_path = release_addon(init_file, addon_name, with_timestamp=False,
-                               release_dir=TEST_RELEASE_DIR, need_zip=False)
+# reload_port: push the changed files to the reload agent listening on this port after the deployment
+# reload_id: the id of the update started by get_reload_latency().start, None to not measure the latency
+# build_task: the task of the build queue, a newer change cancels the build before it is deployed
+# Returns the import graph of the addon
+@traced()
+def update_addon_for_test(init_file, addon_name, reload_port=None, reload_id=None, build_task=None):
+    latency = get_reload_latency()
+    latency.mark(reload_id, STAGE_BUILD_START)
+    add_trace_args(reload_id=reload_id)
+    # the import graph is shared with the release, it is needed again to find the modules to reload
+    try:
+        import_graph = build_import_graph(get_addon_entry_files([addon_name]), PROJECT_ROOT)
+        if build_task is not None:
+            build_task.check_cancelled("release")
+        addon_path = release_addon(init_file, addon_name, with_timestamp=False,
+                                   release_dir=TEST_RELEASE_DIR, need_zip=False, import_graph=import_graph)
+        # the last checkpoint: once the files are copied to blender, the reload message has to follow, the next
+        # deployment only reports the files changed after this one
+        if build_task is not None:
+            build_task.check_cancelled("deploy")
+    except Exception as e:
+        latency.discard(reload_id)
+        add_trace_args(cancelled=isinstance(e, BuildCancelled))
+        raise
+    latency.mark(reload_id, STAGE_BUILD_END)
     executable_path = os.path.join(os.path.dirname(addon_path), addon_name)
 
     test_addon_path = os.path.join(BLENDER_ADDON_PATH, addon_name)
-    if os.path.exists(test_addon_path):
-        shutil.rmtree(test_addon_path)
-    shutil.copytree(executable_path, test_addon_path)
+    # only copy the changed files to the blender addon folder
+    with trace_span("deploy_test_build") as span:
+        sync_result = sync_folder(executable_path, test_addon_path,
+                                  os.path.join(TEST_RELEASE_DIR, addon_name + _DEPLOY_MANIFEST_SUFFIX),
+                                  use_hardlinks=TEST_DEPLOY_USE_HARDLINKS)
+        span.set(copied=len(sync_result.copied), removed=len(sync_result.removed), unchanged=sync_result.unchanged,
+                 bytes_copied=sync_result.bytes_copied)
+    latency.mark(reload_id, STAGE_DEPLOY_DONE)
+
+    # the signature of the build is sent to the reload agent, which skips a build it already loaded. Only the files
+    # changed since the previous update are hashed again.
+    with trace_span("folder_signature") as span:
+        folder_signature = get_folder_signature(executable_path)
+        addon_signature = folder_signature.compute()
+        span.set(hashed_files=folder_signature.hashed_files)
+    if reload_port is not None and sync_result.has_changes():
+        with trace_span("send_reload_message") as span:
+            reload_modules = None
+            if RELOAD_MODE == RELOAD_SELECTIVE and len(sync_result.removed) == 0:
+                reload_modules = get_reload_modules(addon_name, sync_result.copied, import_graph)
+            span.set(selective=reload_modules is not None)
+            on_reply = functools.partial(on_addon_reloaded, reload_id) if reload_id is not None else None
+            latency.mark(reload_id, STAGE_SIGNAL_SENT)
+            if not send_reload_message(reload_port, addon_signature, sync_result.copied + sync_result.removed,
+                                       reload_modules, reload_id, on_reply):
+                latency.discard(reload_id)
+                print("Blender is not listening for addon updates on port", reload_port)
+    else:
+        latency.discard(reload_id)
+    if TRACE_FILE is not None:
+        write_trace()
+    return import_graph
+
 
-    # write an MD5 to the addon folder to inform the addon content has been changed
-    addon_md5 = get_md5_folder(executable_path)
-    write_utf8(os.path.join(test_addon_path, __addon_md5__signature__), addon_md5)
+# Called with the answer of the reload agent after blender reloaded the addon
+def on_addon_reloaded(reload_id, reply: dict):
+    latency = get_reload_latency()
+    sample = latency.complete(reload_id, reply)
+    if sample is None:
+        return
+    print("Addon reloaded in {:.0f} ms ({} reload {})".format(sample["intervals_ms"]["total"], sample["mode"],
+                                                              reload_id))
+    if RELOAD_LATENCY_FILE is not None:
+        latency.dump(RELOAD_LATENCY_FILE)
+
+
+def print_reload_latency():
+    print(get_reload_latency().format_summary())
+
+
+# Returns the modules of the test build to reload for the changed files, the changed modules and all modules importing
+# them, sorted so every module comes after the modules it imports. Returns None when the addon needs a full reload:
+# a file that is not a python module changed, or the change reaches the __init__.py of the addon.
+# changed_files: the paths of the changed files relative to the test build
+def get_reload_modules(addon_name, changed_files, import_graph: dict):
+    changed_py_files = []
+    for rel_path in changed_files:
+        # the __init__.py of the addon is released from the addon folder, its path in the workspace differs
+        if not rel_path.endswith(".py") or rel_path == "__init__.py":
+            return None
+        changed_py_files.append(os.path.abspath(os.path.join(PROJECT_ROOT, rel_path)))
+    affected_files = find_affected_files(changed_py_files, import_graph)
+    if os.path.abspath(get_init_file_path(addon_name)) in affected_files:
+        return None
+    reload_modules = []
+    for file_path in sort_by_imports(affected_files, import_graph):
+        module_path = os.path.splitext(os.path.relpath(file_path, PROJECT_ROOT))[0].split(os.sep)
+        if module_path[-1] == "__init__":
+            module_path = module_path[0:-1]
+        reload_modules.append(".".join([addon_name] + module_path))
+    return reload_modules
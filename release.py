@@ -1,4 +1,5 @@
-from main import get_init_file_path, release_addon, ACTIVE_ADDON
+from main import get_all_addon_names, get_init_file_path, plan_release, release_addon, release_addons
+from main import release_addon_targets, release_affected_addons, ACTIVE_ADDON
 
 # 发布前请修改以下参数
 
@@ -7,5 +8,39 @@ from main import get_init_file_path, release_addon, ACTIVE_ADDON
 addon_name_to_release = ACTIVE_ADDON
 # addon_name_to_release = "new_addon"
 
+# Set to True to release several addons at once with a single dependency analysis.
+# The addons to release, None means every addon in the addons folder
+# 设置为True时一次发布多个插件，addons_to_release为要发布的插件列表，None表示发布addons文件夹下的所有插件
+release_multiple_addons = False
+addons_to_release = None
+# addons_to_release = ["sample_addon", "new_addon"]
+
+# Only release the addons affected by the changes in this git diff range, e.g. "origin/main...HEAD", None to disable.
+# 只发布受此git提交范围内修改影响的插件，None表示不启用
+release_changed_since = None
+# release_changed_since = "origin/main...HEAD"
+
+# Set to True to build the packages of all RELEASE_TARGETS in main.py at once: a legacy addon zip for Blender 2.93 - 4.1
+# and an extension package for Blender 4.2+, from one dependency analysis
+# 设置为True时一次生成RELEASE_TARGETS中所有目标版本的发布包：Blender2.93-4.1的插件和Blender4.2以上的扩展
+release_all_targets = False
+
+# Set to True to only print the files that would be released and the changes since the previous release
+# 设置为True时只打印将要发布的文件以及与上一次发布相比的变化，不会生成发布包
+dry_run = False
+
 if __name__ == '__main__':
-    release_addon(get_init_file_path(addon_name_to_release), addon_name_to_release)
+    if dry_run:
+        addon_names = [addon_name_to_release]
+        if release_multiple_addons:
+            addon_names = addons_to_release or get_all_addon_names()
+        for addon_name in addon_names:
+            plan_release(addon_name)
+    elif release_changed_since is not None:
+        release_affected_addons(diff_range=release_changed_since)
+    elif release_all_targets:
+        release_addon_targets(addon_name_to_release)
+    elif release_multiple_addons:
+        release_addons(addons_to_release)
+    else:
+        release_addon(get_init_file_path(addon_name_to_release), addon_name_to_release)